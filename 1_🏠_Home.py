@@ -5,7 +5,7 @@ import streamlit as st
 import st_utils
 
 st.set_page_config(page_title="Michael Tezak – Data Science", page_icon="🏠", layout="wide")
-st.markdown(f'<style>{open("style.css").read()}</style>', unsafe_allow_html=True)
+st.markdown(f'<style>{st_utils.load_css()}</style>', unsafe_allow_html=True)
 
 st_utils.get_sidebar_links()
 
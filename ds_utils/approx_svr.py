@@ -0,0 +1,56 @@
+"""Support vector regression with an approximated RBF kernel, in time linear in the rows.
+
+sklearn's SVR solves the kernelized problem exactly, which takes quadratic time (or worse) in
+the number of rows. Here the rows are first mapped into an explicit feature space whose inner
+products approximate the RBF kernel, and a linear SVR (same epsilon-insensitive loss) is
+fitted there:
+    - 'nystroem': the kernel between every row and `n_components` sampled rows (Nyström)
+    - 'rff': random Fourier features, `n_components` random cosines (Rahimi & Recht)
+It is a drop-in for SVR as a base estimator or as the final estimator of a stacking model:
+
+    model = make_pipeline(StandardScaler(), ApproxSVR())
+    StackingRegressor(estimators, final_estimator=ApproxSVR())
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.svm import LinearSVR
+from sklearn.utils.validation import check_is_fitted
+
+# Settings
+N_COMPONENTS = 500
+MAX_ITER = 5000
+
+
+class ApproxSVR(RegressorMixin, BaseEstimator):
+    """`gamma`, `C` and `epsilon` as in SVR (gamma='scale' is 1 / (n_features * X.var()))."""
+
+    def __init__(self, kernel_map='nystroem', n_components=N_COMPONENTS, gamma='scale', C=1.0, epsilon=0.1,
+                 max_iter=MAX_ITER, random_state=None):
+        self.kernel_map = kernel_map
+        self.n_components = n_components
+        self.gamma = gamma
+        self.C = C
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        self.n_features_in_ = X.shape[1]
+        gamma = 1 / (X.shape[1] * X.var()) if self.gamma == 'scale' else self.gamma
+        if self.kernel_map == 'nystroem':
+            self.map_ = Nystroem(gamma=gamma, n_components=min(self.n_components, len(X)),
+                                 random_state=self.random_state)
+        elif self.kernel_map == 'rff':
+            self.map_ = RBFSampler(gamma=gamma, n_components=self.n_components, random_state=self.random_state)
+        else:
+            raise ValueError(f"kernel_map must be 'nystroem' or 'rff', got {self.kernel_map!r}")
+        self.svr_ = LinearSVR(C=self.C, epsilon=self.epsilon, dual=True, max_iter=self.max_iter,
+                              random_state=self.random_state)
+        self.svr_.fit(self.map_.fit_transform(X), np.asarray(y, dtype=np.float64))
+        return self
+
+    def predict(self, X):
+        check_is_fitted(self, 'svr_')
+        return self.svr_.predict(self.map_.transform(np.asarray(X, dtype=np.float64)))
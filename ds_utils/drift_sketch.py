@@ -0,0 +1,278 @@
+"""Mergeable per-feature sketches for train/test drift checks (PSI, KS) in one streaming pass.
+
+Every feature gets
+    - a histogram over fixed bin edges (shared by all sketches of a dataset, so their counts
+      simply add up), plus a missing-value count: the Population Stability Index comes from these
+    - a quantile sketch, a small set of weighted centroids in the manner of a merging t-digest
+      (finer in the tails, at most ~`compression` centroids), which gives quantiles and an
+      approximate CDF: the Kolmogorov-Smirnov statistic is the largest difference of their step
+      CDFs, off by at most the weight of a centroid (< 1 % with the default compression), even
+      for discrete features
+Both merge without the raw rows, so a dataset is read once, in chunks, into one sketch per
+slice (file, and optionally the values of a `by` column), and any two unions of slices can be
+compared afterwards:
+
+    sketches = drift_sketch.sketch_csv({'train': 'train.csv', 'test': 'test.csv'}, by='Location')
+    drift_sketch.compare(sketches['train/Sydney'], drift_sketch.merge(sketches.values()))
+
+    python -m ds_utils.drift_sketch data/smoker_status/drift_sketches.joblib train=train.csv test=test.csv
+"""
+import argparse
+import copy
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Paths
+SKETCH_PATHS = {
+    'smoker': 'data/smoker_status/drift_sketches.joblib',
+    'mohs': 'data/mohs_hardness/drift_sketches.joblib',
+}
+
+# Settings
+BINS = 20
+DISCRETE_MAX_VALUES = 256           # columns with at most this many distinct values get a bin per value
+COMPRESSION = 200
+CHUNKSIZE = 100_000
+PSI_EPS = 1e-4                      # share given to empty bins, which would make PSI infinite
+PSI_MODERATE, PSI_MAJOR = 0.1, 0.25
+
+
+def _compress(means, weights, compression):
+    """Merge sorted-by-mean centroids whose quantiles fall into the same unit of the k1 scale."""
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    cum = np.cumsum(weights)
+    q = (cum - weights / 2) / cum[-1]
+    k = np.floor(compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+    starts = np.flatnonzero(np.r_[True, np.diff(k) > 0])
+    merged = np.add.reduceat(weights, starts)
+    low, high = np.minimum.reduceat(means, starts), np.maximum.reduceat(means, starts)
+    # Ties stay exactly on their value, or the step CDFs of two sketches would disagree around it
+    merged_means = np.where(low == high, low, np.clip(np.add.reduceat(means * weights, starts) / merged, low, high))
+    return merged_means, merged
+
+
+class FeatureSketch:
+
+    def __init__(self, edges, compression=COMPRESSION):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.compression = compression
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)    # below edges[0], ..., from edges[-1] on
+        self.missing = 0
+        self.min, self.max = np.inf, -np.inf
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def n(self):
+        """Number of non-missing values."""
+        return int(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        values = values[~nan]
+        if len(values):
+            self.counts += np.bincount(np.searchsorted(self.edges, values, side='right'), minlength=len(self.counts))
+            self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+            self._absorb(values, np.ones(len(values)))
+        return self
+
+    def merge(self, other):
+        """A new sketch of the values of both."""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError('sketches with different bin edges cannot be merged')
+        merged = copy.deepcopy(self)
+        merged.counts += other.counts
+        merged.missing += other.missing
+        merged.min, merged.max = min(self.min, other.min), max(self.max, other.max)
+        if len(other.weights):
+            merged._absorb(other.means, other.weights)
+        return merged
+
+    def _absorb(self, means, weights):
+        self.means, self.weights = _compress(np.r_[self.means, means], np.r_[self.weights, weights], self.compression)
+
+    def _knots(self):
+        # Centroids of tied values as one knot, at the middle of their mass (so a tie's CDF is its mid-rank)
+        means, starts = np.unique(self.means, return_index=True)
+        weights = np.add.reduceat(self.weights, starts)
+        cum = np.cumsum(weights)
+        values, probs = means, (cum - weights / 2) / cum[-1]
+        if self.min < means[0]:
+            values, probs = np.r_[self.min, values], np.r_[0, probs]
+        if self.max > means[-1]:
+            values, probs = np.r_[values, self.max], np.r_[probs, 1]
+        return values, probs
+
+    def quantile(self, q):
+        values, probs = self._knots()
+        return np.interp(q, probs, values)
+
+    def cdf(self, x):
+        values, probs = self._knots()
+        return np.interp(x, values, probs)
+
+    def step_cdf(self, x):
+        """Share of the weight in centroids <= x."""
+        cum = np.cumsum(self.weights)
+        k = np.searchsorted(self.means, x, side='right')
+        return np.where(k > 0, cum[k - 1], 0) / cum[-1]
+
+    def shares(self):
+        """Share of every bin, missing values as an extra last bin."""
+        counts = np.r_[self.counts, self.missing]
+        return counts / max(counts.sum(), 1)
+
+
+class DatasetSketch:
+
+    def __init__(self, edges, compression=COMPRESSION):
+        self.features = {col: FeatureSketch(e, compression) for col, e in edges.items()}
+        self.rows = 0
+
+    @property
+    def columns(self):
+        return list(self.features)
+
+    def update(self, df):
+        for col, sketch in self.features.items():
+            sketch.update(df[col].to_numpy())
+        self.rows += len(df)
+        return self
+
+    def merge(self, other):
+        merged = copy.copy(self)
+        merged.features = {col: sketch.merge(other.features[col]) for col, sketch in self.features.items()}
+        merged.rows = self.rows + other.rows
+        return merged
+
+
+def merge(sketches):
+    sketches = list(sketches)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def bin_edges(df, columns, bins=BINS):
+    """Edges from a sample: between the distinct values of discrete columns, `bins` bins at
+    quantiles otherwise."""
+    edges = {}
+    for col in columns:
+        values = np.unique(df[col].dropna().to_numpy(dtype=np.float64))
+        if len(values) <= DISCRETE_MAX_VALUES:
+            edges[col] = (values[:-1] + values[1:]) / 2
+        else:
+            edges[col] = np.unique(np.quantile(df[col].dropna(), np.linspace(0, 1, bins + 1)[1:-1]))
+    return edges
+
+
+def psi(a, b, bins=BINS, eps=PSI_EPS):
+    p, q = a.shares(), b.shares()
+    if len(p) > bins + 2:
+        # The per-value bins of a discrete feature, grouped into about `bins` quantiles of a: each
+        # bin goes to the group of a's cumulative share at its midpoint (the share below it plus half
+        # its own), so a frequent value stays in one group; missing values keep their own last group
+        group = np.minimum((np.cumsum(a.counts) - a.counts / 2) / max(a.n, 1) * bins, bins - 1).astype(int)
+        group = np.r_[group, bins]
+        p, q = np.bincount(group, weights=p), np.bincount(group, weights=q)
+    p, q = np.maximum(p, eps), np.maximum(q, eps)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(a, b):
+    if not (a.n and b.n):
+        return np.nan
+    grid = np.union1d(a.means, b.means)
+    return float(np.max(np.abs(a.step_cdf(grid) - b.step_cdf(grid))))
+
+
+def compare(a, b):
+    """PSI and KS of every feature, b against the reference a, most drifted first."""
+    rows = []
+    for col in a.columns:
+        fa, fb = a.features[col], b.features[col]
+        value = psi(fa, fb)
+        rows.append({
+            'feature': col,
+            'psi': value,
+            'ks': ks(fa, fb),
+            'drift': 'major' if value >= PSI_MAJOR else 'moderate' if value >= PSI_MODERATE else 'none',
+            'median_a': fa.quantile(0.5) if fa.n else np.nan,
+            'median_b': fb.quantile(0.5) if fb.n else np.nan,
+            'missing_a': fa.missing / max(a.rows, 1),
+            'missing_b': fb.missing / max(b.rows, 1),
+        })
+    return pd.DataFrame(rows).sort_values('psi', ascending=False, ignore_index=True)
+
+
+def _slices(chunk, name, by):
+    if by is None:
+        yield name, chunk
+    else:
+        for value, part in chunk.groupby(by, observed=True):
+            yield f'{name}/{value}', part
+
+
+def sketch_csv(paths, columns=None, by=None, chunksize=CHUNKSIZE, bins=BINS, compression=COMPRESSION):
+    """{name/slice: DatasetSketch} of the CSVs `paths` ({name: path}), read once in chunks.
+
+    The bin edges are taken from the first chunk of the first file; `columns` defaults to the
+    numeric columns all files share (without 'id').
+    """
+    if columns is None:
+        heads = [pd.read_csv(path, nrows=1000) for path in paths.values()]
+        columns = [c for c in heads[0].select_dtypes('number').columns
+                   if c != 'id' and c != by and all(c in head for head in heads)]
+    first = pd.read_csv(next(iter(paths.values())), usecols=columns, nrows=chunksize)
+    edges = bin_edges(first, columns, bins)
+
+    sketches = {}
+    for name, path in paths.items():
+        usecols = columns + ([by] if by else [])
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+            for key, part in _slices(chunk, name, by):
+                if key not in sketches:
+                    sketches[key] = DatasetSketch(edges, compression)
+                sketches[key].update(part)
+    return sketches
+
+
+def save(sketches, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(sketches, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load(path):
+    return joblib.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sketch CSV files for drift checks.')
+    parser.add_argument('output', help='where to save the sketches, e.g. ' + SKETCH_PATHS['smoker'])
+    parser.add_argument('csv', nargs='+', metavar='NAME=PATH', help='e.g. train=train.csv test=test.csv')
+    parser.add_argument('--by', help='also slice every file by the values of this column')
+    parser.add_argument('--columns', nargs='+', help='features to sketch (default: shared numeric columns)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    paths = dict(arg.split('=', 1) for arg in args.csv)
+    # Through the imported module: sketches created by __main__'s classes couldn't be unpickled elsewhere
+    from ds_utils import drift_sketch
+    sketches = drift_sketch.sketch_csv(paths, args.columns, args.by, args.chunksize)
+    save(sketches, args.output)
+    print(f'{len(sketches)} slices, {os.path.getsize(args.output) / 1024:.0f}KB in {args.output}')
+    if len(paths) >= 2:
+        a, b = (merge(s for key, s in sketches.items() if key.split('/')[0] == name) for name in list(paths)[:2])
+        print(compare(a, b).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Append-only log of model comparison runs, one JSON line per (model, fold).
+
+Every record holds the fold's loss, the seconds spent per stage (searching hyperparameters, see
+ds_utils.halving_search; generating the features of a stacked model, i.e. its share of the base
+estimators' OOF predictions; fitting; predicting),
+the peak memory the job added, and the hashes of the data and of the model's configuration, so
+runs on different data or with different parameters can be told apart. Records are appended
+(and flushed) as soon as a fold finishes, so the page can render a comparison while it runs:
+
+    run = experiment_log.open_log(LOG_PATHS['mohs']).start_run('mohs', X, y)
+    model_comparison.compare('mohs', X, y, on_record=run.record)
+
+    python -m scripts.compare_models mohs --csv train.csv          # logs to LOG_PATHS['mohs']
+    python -m ds_utils.experiment_log data/mohs_hardness/experiments.jsonl
+
+Reading is incremental: `records()` only parses the lines appended since its last call.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+# Local imports
+from ds_utils.oof_cache import data_hash, estimator_key
+
+# Paths
+LOG_PATHS = {
+    'mohs': 'data/mohs_hardness/experiments.jsonl',
+    'smoker': 'data/smoker_status/experiments.jsonl',
+}
+
+# Settings
+STAGES = ['search_s', 'features_s', 'fit_s', 'predict_s']
+
+
+def config_hash(estimator):
+    """Short hash of the estimator's class and parameters (nested estimators included)."""
+    return hashlib.sha1(estimator_key(estimator).encode()).hexdigest()[:12]
+
+
+class Run:
+    """Stamps the records of one run with its id, start time and data hash, and appends them."""
+
+    def __init__(self, log, task, data):
+        self.log = log
+        self.id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:6]}'
+        self.task = task
+        self.data = data
+        self.started = time.time()
+
+    def record(self, record):
+        self.log.append({'run': self.id, 'started': self.started, 'task': self.task, 'data_hash': self.data,
+                         'search_s': 0.0, 'features_s': 0.0, 'logged': time.time()} | record)
+
+
+class ExperimentLog:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._inode = None
+        self._rows = []
+
+    def start_run(self, task, X, y):
+        return Run(self, task, data_hash(X, y)[:12])
+
+    def append(self, record):
+        line = json.dumps(record, default=float) + '\n'
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+            f.flush()
+
+    def version(self):
+        """Changes with every append, for use as a cache key; None without a log."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def records(self):
+        """All records as a DataFrame (empty without a log), reading only what was appended since the last call."""
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    inode = os.fstat(f.fileno()).st_ino
+                    if inode != self._inode or os.fstat(f.fileno()).st_size < self._offset:
+                        self._offset, self._inode, self._rows = 0, inode, []     # replaced or truncated
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return pd.DataFrame()
+            # A line still being written has no newline yet; it's picked up by the next call
+            complete = data[:data.rfind(b'\n') + 1]
+            self._rows.extend(json.loads(line) for line in complete.splitlines() if line.strip())
+            self._offset += len(complete)
+            return pd.DataFrame(self._rows)
+
+
+@functools.lru_cache(maxsize=None)
+def open_log(path):
+    """The process-wide ExperimentLog of `path`, so its incremental reads are shared."""
+    return ExperimentLog(path)
+
+
+def summarize(records):
+    """Per run and model: fold count, loss mean/std, the seconds per stage summed over the folds,
+    end-to-end runtime (all stages) and the largest peak memory."""
+    df = records.assign(**{stage: records.get(stage, 0.0) for stage in STAGES})    # stages added later
+    df = df.assign(runtime=df[STAGES].fillna(0).sum(axis=1))
+    summary = df.groupby(['run', 'model'], sort=False).agg(
+        task=('task', 'first'), group=('group', 'first'), folds=('fold', 'nunique'),
+        loss_mean=('loss', 'mean'), loss_std=('loss', lambda s: s.std(ddof=0)),
+        **{stage: (stage, 'sum') for stage in STAGES}, runtime=('runtime', 'sum'),
+        peak_mem_mb=('peak_mem_mb', 'max'), data_hash=('data_hash', 'first'), config_hash=('config_hash', 'first'),
+        started=('started', 'first'),
+    ).reset_index()
+    return summary.sort_values('loss_mean', ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize the runs of an experiment log.')
+    parser.add_argument('path', nargs='?', default=LOG_PATHS['mohs'])
+    parser.add_argument('--run', help='only this run (default: all)')
+    args = parser.parse_args(argv)
+
+    records = open_log(args.path).records()
+    if records.empty:
+        print(f'no records in {args.path}')
+        return
+    if args.run:
+        records = records[records['run'] == args.run]
+    columns = ['run', 'model', 'group', 'folds', 'loss_mean', 'loss_std', 'runtime', 'peak_mem_mb']
+    print(summarize(records)[columns].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
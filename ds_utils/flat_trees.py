@@ -0,0 +1,294 @@
+"""Tree ensembles flattened into contiguous numpy arrays, scored with a vectorized traversal.
+
+All nodes of all trees go into one set of arrays: split feature, threshold, left and right
+child, the direction of missing values and the leaf value. Leaves point back to themselves
+(with an infinite threshold), so a batch of rows walks every tree at once, one level per step,
+for as many steps as the deepest tree has levels, without any per-node Python:
+
+    flat = flat_trees.export(model)             # fitted Pipeline / ensemble / StackingClassifier
+    flat.predict_proba(X)[:, 1]
+
+Supported: sklearn's HistGradientBoostingClassifier, RandomForestClassifier,
+ExtraTreesClassifier, LightGBM and XGBoost binary classifiers, pipelines ending in one of them
+(the preprocessing steps are kept as they are) and a StackingClassifier of those with a
+LogisticRegression on top. A StandardScaler right in front of the trees is folded into their
+thresholds. The exported model only needs numpy and the remaining preprocessing steps, so
+loading it doesn't import LightGBM or XGBoost.
+
+Built for single rows and small batches, where it beats the libraries' own predict by
+skipping their input validation (see scripts/benchmark_flat_trees.py); from about a thousand
+rows on, their compiled traversal is faster.
+"""
+import json
+
+import numpy as np
+from scipy.special import expit, logit
+from sklearn.ensemble import (ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier,
+                              StackingClassifier)
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Settings
+EXIT_CHECK_LEVELS = 4               # levels between checks whether all rows have reached their leaves
+
+
+class _Builder:
+    """Collects the nodes of all trees; node ids are positions in the final arrays."""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right, self.missing_left, self.value = [], [], [], [], [], []
+        self.roots = []
+        self.depth = 0
+
+    def split(self, feature, threshold, missing_left):
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.missing_left.append(missing_left)
+        self.value.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        return len(self.feature) - 1
+
+    def leaf(self, value):
+        node = self.split(0, np.inf, True)
+        self.left[node] = self.right[node] = node
+        self.value[node] = value
+        return node
+
+    def build(self, **kwargs):
+        return FlatEnsemble(
+            np.array(self.feature, dtype=np.int32), np.array(self.threshold, dtype=np.float64),
+            np.array(self.left, dtype=np.int32), np.array(self.right, dtype=np.int32),
+            np.array(self.missing_left, dtype=bool), np.array(self.value, dtype=np.float64),
+            np.array(self.roots, dtype=np.int32), self.depth, **kwargs,
+        )
+
+
+class FlatEnsemble:
+    """The trees of one ensemble; raw score = base + sum (or mean) of the leaf values reached."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, depth, base=0.0,
+                 aggregate='sum', link='logistic', float32_inputs=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base = base
+        self.aggregate = aggregate
+        self.link = link                        # 'logistic': raw score is a logit, 'identity': a probability
+        self.float32_inputs = float32_inputs    # compare float32 inputs, as XGBoost does
+        self._children = np.column_stack([right, left]).ravel()     # [2 * node + go_left]
+        self._is_leaf = left == np.arange(len(left))
+
+    def __setstate__(self, state):
+        # Memory-mapped by the model registry: plain ndarray views, np.memmap's wrapping slows every take
+        self.__dict__.update({key: np.asarray(value) if isinstance(value, np.ndarray) else value
+                              for key, value in state.items()})
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaves(self, X):
+        """(rows, trees) ids of the leaf every row ends up in, in every tree."""
+        X = np.asarray(X, dtype=np.float32 if self.float32_inputs else np.float64).astype(np.float64, copy=False)
+        if X.ndim == 1:
+            X = X[None]
+        # 1-d takes on raveled arrays are much cheaper than 2-d fancy indexing for a few rows
+        values = np.ascontiguousarray(X).ravel()
+        offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.repeat(self.roots[None], len(X), axis=0)
+        for level in range(1, self.depth + 1):
+            x = values.take(offsets + self.feature.take(node))
+            go_left = (x <= self.threshold.take(node)) | (np.isnan(x) & self.missing_left.take(node))
+            node = self._children.take(2 * node + go_left)
+            # Most paths end well above the deepest leaf
+            if level % EXIT_CHECK_LEVELS == 0 and self._is_leaf.take(node).all():
+                break
+        return node
+
+    def decision_function(self, X):
+        values = self.value[self.leaves(X)]
+        return self.base + (values.sum(axis=1) if self.aggregate == 'sum' else values.mean(axis=1))
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        p = expit(raw) if self.link == 'logistic' else raw
+        return np.column_stack([1 - p, p])
+
+
+class FlatModel:
+    """Preprocessing + flat ensemble per base model, and optionally a logistic regression on top."""
+
+    def __init__(self, bases, final=None):
+        self.bases = bases          # [(preprocessing transformers, FlatEnsemble)]
+        self.final = final          # (coef, intercept) or None
+
+    def predict_proba(self, X):
+        columns = []
+        for steps, ensemble in self.bases:
+            # The steps one by one: Pipeline.transform's validation costs more than they do for a single row
+            Xt = X
+            for step in steps:
+                Xt = step.transform(Xt)
+            columns.append(ensemble.predict_proba(Xt)[:, 1])
+        if self.final is None:
+            p = columns[0]
+        else:
+            coef, intercept = self.final
+            p = expit(np.column_stack(columns) @ coef + intercept)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+
+def from_hist_gradient_boosting(model):
+    if model.n_trees_per_iteration_ != 1:
+        raise ValueError('only binary classification is supported')
+    builder = _Builder()
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes['is_categorical'].any():
+            raise ValueError('categorical splits are not supported')
+        offset = len(builder.feature)
+        for node in nodes:
+            if node['is_leaf']:
+                builder.leaf(node['value'])
+            else:
+                i = builder.split(node['feature_idx'], node['num_threshold'], bool(node['missing_go_to_left']))
+                builder.left[i], builder.right[i] = offset + node['left'], offset + node['right']
+        builder.roots.append(offset)
+        builder.depth = max(builder.depth, int(nodes['depth'].max()))
+    return builder.build(base=float(np.ravel(model._baseline_prediction)[0]))
+
+
+def from_sklearn_forest(model):
+    builder = _Builder()
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1 or tree.value.shape[2] != 2:
+            raise ValueError('only binary classification is supported')
+        offset = len(builder.feature)
+        proba = tree.value[:, 0, 1] / tree.value[:, 0].sum(axis=1)
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        for i in range(tree.node_count):
+            if tree.children_left[i] == -1:
+                builder.leaf(proba[i])
+            else:
+                j = builder.split(tree.feature[i], tree.threshold[i], bool(missing_left[i]))
+                builder.left[j], builder.right[j] = offset + tree.children_left[i], offset + tree.children_right[i]
+        builder.roots.append(offset)
+        builder.depth = max(builder.depth, tree.max_depth)
+    # sklearn's trees compare float32 inputs
+    return builder.build(aggregate='mean', link='identity', float32_inputs=True)
+
+
+def from_lightgbm(model):
+    dump = model.booster_.dump_model()
+    if dump['num_class'] != 1 or not dump['objective'].startswith('binary'):
+        raise ValueError('only binary classification is supported')
+    sigmoid = float(dump['objective'].split('sigmoid:')[1]) if 'sigmoid:' in dump['objective'] else 1.0
+    builder = _Builder()
+
+    def add(node, depth):
+        builder.depth = max(builder.depth, depth)
+        if 'leaf_value' in node:
+            return builder.leaf(sigmoid * node['leaf_value'])
+        if node['decision_type'] != '<=' or node['missing_type'] == 'Zero':
+            raise ValueError('categorical splits and zero-as-missing are not supported')
+        threshold = float(node['threshold'])
+        # missing_type 'None': LightGBM compares NaN as 0
+        missing_left = node['default_left'] if node['missing_type'] == 'NaN' else 0 <= threshold
+        i = builder.split(node['split_feature'], threshold, bool(missing_left))
+        builder.left[i] = add(node['left_child'], depth + 1)
+        builder.right[i] = add(node['right_child'], depth + 1)
+        return i
+
+    for tree in dump['tree_info']:
+        builder.roots.append(len(builder.feature))
+        add(tree['tree_structure'], 0)
+    return builder.build()
+
+
+def from_xgboost(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())['learner']
+    if not config['objective']['name'].startswith('binary:logistic'):
+        raise ValueError('only binary:logistic is supported')
+    base_score = float(config['learner_model_param']['base_score'].strip('[]'))
+    names = {name: i for i, name in enumerate(booster.feature_names or [])}
+    builder = _Builder()
+
+    def add(node, depth):
+        builder.depth = max(builder.depth, depth)
+        if 'leaf' in node:
+            return builder.leaf(node['leaf'])
+        if 'split_condition' not in node:
+            raise ValueError('indicator splits are not supported')
+        split = node['split']
+        feature = names[split] if split in names else int(split.lstrip('f'))
+        # XGBoost goes left if x < condition (in float32), i.e. if x <= the next smaller float32
+        threshold = float(np.nextafter(np.float32(node['split_condition']), np.float32(-np.inf)))
+        i = builder.split(feature, threshold, node['missing'] == node['yes'])
+        children = {child['nodeid']: child for child in node['children']}
+        builder.left[i] = add(children[node['yes']], depth + 1)
+        builder.right[i] = add(children[node['no']], depth + 1)
+        return i
+
+    for tree in booster.get_dump(dump_format='json'):
+        builder.roots.append(len(builder.feature))
+        add(json.loads(tree), 0)
+    return builder.build(base=float(logit(base_score)), float32_inputs=True)
+
+
+def flatten(estimator):
+    """FlatEnsemble of a fitted tree ensemble; ValueError if it isn't a supported one."""
+    if isinstance(estimator, HistGradientBoostingClassifier):
+        return from_hist_gradient_boosting(estimator)
+    if isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+        return from_sklearn_forest(estimator)
+    module = type(estimator).__module__
+    if module.startswith('lightgbm'):
+        return from_lightgbm(estimator)
+    if module.startswith('xgboost'):
+        return from_xgboost(estimator)
+    raise ValueError(f'{type(estimator).__name__} is not a supported tree ensemble')
+
+
+def fold_scaler(ensemble, scaler):
+    """Move a StandardScaler in front of the ensemble into its thresholds: with scale > 0,
+    (x - mean) / scale <= t  <=>  x <= t * scale + mean."""
+    split = ~ensemble._is_leaf
+    f = ensemble.feature[split]
+    mean = scaler.mean_[f] if scaler.with_mean else 0.0
+    scale = scaler.scale_[f] if scaler.with_std else 1.0
+    ensemble.threshold[split] = ensemble.threshold[split] * scale + mean
+    return ensemble
+
+
+def _base(estimator):
+    if not isinstance(estimator, Pipeline):
+        return [], flatten(estimator)
+    ensemble = flatten(estimator[-1])
+    steps = [step for _, step in estimator.steps[:-1] if step not in (None, 'passthrough')]
+    if steps and isinstance(steps[-1], StandardScaler) and not ensemble.float32_inputs:
+        ensemble = fold_scaler(ensemble, steps.pop())
+    return steps, ensemble
+
+
+def export(model):
+    """FlatModel of a fitted ensemble, Pipeline or StackingClassifier; ValueError if unsupported."""
+    if not isinstance(model, StackingClassifier):
+        return FlatModel([_base(model)])
+    if model.passthrough or any(method != 'predict_proba' for method in model.stack_method_):
+        raise ValueError('only stacking on predict_proba without passthrough is supported')
+    if not isinstance(model.final_estimator_, LogisticRegression):
+        raise ValueError('only a LogisticRegression final estimator is supported')
+    final = model.final_estimator_
+    return FlatModel([_base(est) for est in model.estimators_], (final.coef_[0], final.intercept_[0]))
@@ -0,0 +1,231 @@
+"""Successive-halving hyperparameter search over the model zoos of ds_utils.model_comparison.
+
+Every model with a SPACES entry gets `n_configs` random configurations from it. All of them are
+evaluated on the first fold of the cross validation with a small budget; the best 1/eta move
+up a rung, to eta times the budget, until one is left at the full budget. Only that one is
+cross-validated, on the other folds: the first fold picked the winner, so its loss would be
+optimistic, and it's left out of the records. The budget is
+
+    - for the ensembles in ITERATION_PARAMS, the number of boosting iterations (or trees), up to
+      the configured one; they're warm-started: a promoted configuration keeps its model and
+      only fits the additional iterations
+    - for all other models, the share of the fold's training rows
+
+The trials of a rung (across all models, slowest first) run in parallel threads, which the
+fitting code of sklearn, LightGBM and XGBoost mostly runs without the GIL. Their timings and
+peak memory (the process' RSS) would include the concurrent trials' work, so only their seconds
+are kept, for the trials table and the records' 'search_s'. The winners' folds run one at a time,
+so the records' fit/predict seconds and peak memory are measured like model_comparison's:
+
+    records, trials = halving_search.search('mohs', X, y, n_configs=27, on_record=run.record)
+
+`records` are model_comparison records, one per fold (but the first) of every model's winner,
+named '<model> (tuned)'. The seconds spent on all of its trials are spread over its folds as
+'search_s', so the experiment log compares accuracy per CPU second of tuned and untuned models.
+"""
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.stats import loguniform
+from sklearn.model_selection import ParameterSampler
+
+# Local imports
+from ds_utils import model_comparison
+from ds_utils.experiment_log import config_hash
+from ds_utils.oof_cache import predict_scores
+
+# Settings
+N_CONFIGS = 27
+ETA = 3
+MIN_ROWS = 100
+DEFAULT_ITERATIONS = 100            # XGBoost's n_estimators=None
+ITERATION_PARAMS = {
+    'HistGradientBoostingClassifier': 'max_iter',
+    'RandomForestClassifier': 'n_estimators',
+    'ExtraTreesClassifier': 'n_estimators',
+    'XGBClassifier': 'n_estimators',
+    'LGBMClassifier': 'n_estimators',
+    'RandomForestRegressor': 'n_estimators',
+    'XGBRegressor': 'n_estimators',
+    'LGBMRegressor': 'n_estimators',
+}
+
+_FOREST = {'max_depth': [None, 8, 16, 32], 'min_samples_leaf': [1, 2, 5, 10], 'max_features': ['sqrt', 0.5, 1.0]}
+_XGB = {'learning_rate': loguniform(0.01, 0.3), 'max_depth': [3, 4, 6, 8, 10], 'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.5, 0.75, 1.0], 'min_child_weight': loguniform(0.5, 20)}
+_LGBM = {'learning_rate': loguniform(0.01, 0.3), 'num_leaves': [15, 31, 63, 127], 'min_child_samples': [5, 10, 20, 50],
+         'subsample': [0.6, 0.8, 1.0], 'subsample_freq': [1], 'colsample_bytree': [0.5, 0.75, 1.0]}
+SPACES = {
+    'smoker': {
+        'LogisticRegression': {'C': loguniform(1e-3, 1e2)},
+        'LinearSVC': {'C': loguniform(1e-3, 1e1)},
+        'RandomForestClassifier': _FOREST,
+        'AdaBoostClassifier': {'learning_rate': loguniform(0.05, 2), 'n_estimators': [50, 100, 200]},
+        'HistGradientBoostingClassifier': {
+            'learning_rate': loguniform(0.02, 0.3), 'max_leaf_nodes': [15, 31, 63, 127],
+            'min_samples_leaf': [10, 20, 50, 100], 'l2_regularization': loguniform(1e-4, 10),
+        },
+        'ExtraTreesClassifier': _FOREST,
+        'XGBClassifier': _XGB,
+        'LGBMClassifier': _LGBM,
+    },
+    'mohs': {
+        'SVR': {'C': loguniform(0.1, 100), 'epsilon': [0.01, 0.1, 0.3], 'gamma': ['scale', 0.03, 0.1, 0.3]},
+        'ApproxSVR': {'C': loguniform(0.1, 10), 'epsilon': [0.01, 0.1, 0.3], 'gamma': ['scale', 0.03, 0.1, 0.3]},
+        'RandomForestRegressor': _FOREST,
+        'XGBRegressor': _XGB,
+        'LGBMRegressor': _LGBM,
+    },
+}
+
+
+@dataclass
+class Trial:
+    model: str
+    index: int
+    params: dict
+    pipeline: object = None         # the latest fit on the first fold (warm-started ones keep growing)
+    max_iterations: int = 0         # the full budget of a warm-started model
+    iterations: int = 0             # its current number of iterations
+    loss: float = np.nan
+    cost_s: float = 0.0             # seconds of all its rungs
+
+
+def sample_configs(task_name, name, n_configs=N_CONFIGS, seed=model_comparison.SEED):
+    space = SPACES[task_name].get(name)
+    if not space:
+        return [{}]
+    return [{k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+            for params in ParameterSampler(space, n_configs, random_state=seed)]
+
+
+def make_pipeline_for(task, name, params):
+    pipeline = model_comparison.make_pipeline_for(task, name)
+    estimator = pipeline[-1].set_params(**params)
+    if name in ITERATION_PARAMS and 'warm_start' in estimator.get_params():
+        estimator.set_params(warm_start=True)
+    return pipeline
+
+
+def _grow(pipeline, X, y, iterations, previous):
+    """Fit the pipeline's ensemble up to `iterations`, continuing from `previous` ones."""
+    estimator, step = pipeline[-1], pipeline.steps[-1][0]
+    param = ITERATION_PARAMS[type(estimator).__name__]
+    module = type(estimator).__module__
+    if previous and module.startswith('lightgbm'):
+        estimator.set_params(**{param: iterations - previous})
+        return pipeline.fit(X, y, **{f'{step}__init_model': estimator.booster_})
+    if previous and module.startswith('xgboost'):
+        estimator.set_params(**{param: iterations - previous})
+        return pipeline.fit(X, y, **{f'{step}__xgb_model': estimator.get_booster()})
+    # sklearn's ensembles have warm_start=True: only the additional iterations are fitted
+    estimator.set_params(**{param: iterations})
+    return pipeline.fit(X, y)
+
+
+def _run_trial(task, trial, budget, rung, X, y, train, test):
+    start = time.perf_counter()
+    if trial.model in ITERATION_PARAMS:
+        if trial.pipeline is None:
+            trial.pipeline = make_pipeline_for(task, trial.model, trial.params)
+            param = ITERATION_PARAMS[trial.model]
+            trial.max_iterations = trial.pipeline[-1].get_params()[param] or DEFAULT_ITERATIONS
+        iterations = max(1, round(budget * trial.max_iterations))
+        _grow(trial.pipeline, X[train], y[train], iterations, trial.iterations)
+        trial.iterations = iterations
+    else:
+        rows = train[:max(MIN_ROWS, round(budget * len(train)))]
+        trial.pipeline = make_pipeline_for(task, trial.model, trial.params).fit(X[rows], y[rows])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pred = predict_scores(trial.pipeline, X[test])
+    predict_s = time.perf_counter() - start
+    trial.loss = float(task.loss(y[test], pred))
+    trial.cost_s += fit_s + predict_s
+    return {'model': trial.model, 'trial': trial.index, 'rung': rung, 'budget': budget, 'loss': trial.loss,
+            'fit_s': fit_s, 'predict_s': predict_s, 'params': json.dumps(trial.params, default=str)}
+
+
+def _run_fold(task, trial, fold, X, y, train, test):
+    pipeline = make_pipeline_for(task, trial.model, trial.params)
+    with model_comparison.PeakMemory() as memory:
+        start = time.perf_counter()
+        pipeline.fit(X[train], y[train])
+        fit_s = time.perf_counter() - start
+        start = time.perf_counter()
+        pred = predict_scores(pipeline, X[test])
+        predict_s = time.perf_counter() - start
+    return trial, fold, float(task.loss(y[test], pred)), fit_s, predict_s, memory.peak_mb
+
+
+def search(task_name, X, y, models=None, n_configs=N_CONFIGS, eta=ETA, n_splits=model_comparison.N_SPLITS,
+           n_jobs=None, seed=model_comparison.SEED, on_record=None, on_trial=None):
+    """(records of the winners' cross validation, DataFrame of all trials)
+
+    `on_record` is called with each record, `on_trial` with the summary of each trial, as soon
+    as they're done.
+    """
+    task = model_comparison.TASKS[task_name]
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    folds = task.folds(y, n_splits, seed)
+    train, test = folds[0]
+    train = np.random.default_rng(seed).permutation(train)      # row budgets take a random subset
+    names = models or [name for name in task.available() if name in SPACES[task_name]]
+    alive = {name: [Trial(name, i, params) for i, params in enumerate(sample_configs(task_name, name, n_configs, seed))]
+             for name in names}
+    dropped = {name: [] for name in names}
+    depth = {name: math.ceil(round(math.log(len(trials), eta), 9)) for name, trials in alive.items()}
+    parallel = Parallel(n_jobs or os.cpu_count(), prefer='threads', return_as='generator_unordered')
+
+    history = []
+    rungs = max(depth.values())
+    for rung in range(rungs):
+        jobs = []
+        for name, trials in alive.items():
+            level = rung - (rungs - depth[name])                # models with fewer configs join later
+            if level >= 0:
+                jobs += [(trial, float(eta) ** (level + 1 - depth[name])) for trial in trials]
+        jobs.sort(key=lambda job: -task.models[job[0].model].cost * job[1])
+        for summary in parallel(delayed(_run_trial)(task, trial, budget, rung, X, y, train, test)
+                                for trial, budget in jobs):
+            history.append(summary)
+            if on_trial is not None:
+                on_trial(summary)
+        for name in {trial.model for trial, _ in jobs}:
+            ranked = sorted(alive[name], key=lambda trial: trial.loss)
+            alive[name] = ranked[:max(1, len(ranked) // eta)]
+            dropped[name] += ranked[len(alive[name]):]
+
+    # Cross validation of the winners on the folds not used to pick them, one fold at a time
+    winners = {name: trials[0] for name, trials in alive.items()}
+    search_s = {name: sum(trial.cost_s for trial in dropped[name]) + winner.cost_s for name, winner in winners.items()}
+    results = (_run_fold(task, winner, fold, X, y, *folds[fold])
+               for winner in winners.values() for fold in range(1, n_splits))
+
+    records = []
+    for winner, fold, loss, fit_s, predict_s, peak_mb in results:
+        record = {
+            'task': task_name,
+            'model': f'{winner.model} (tuned)',
+            'group': task.models[winner.model].group,
+            'fold': fold,
+            'loss': loss,
+            'search_s': search_s[winner.model] / (n_splits - 1),
+            'fit_s': fit_s,
+            'predict_s': predict_s,
+            'peak_mem_mb': peak_mb,
+            'worker': os.getpid(),
+            'config_hash': config_hash(make_pipeline_for(task, winner.model, winner.params)),
+            'params': json.dumps(winner.params, default=str),
+        }
+        records.append(record)
+        if on_record is not None:
+            on_record(record)
+    return records, pd.DataFrame(history)
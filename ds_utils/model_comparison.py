@@ -0,0 +1,265 @@
+"""Cross-validated model comparison, every (model, fold) pair running in a process pool.
+
+The feature matrix and target are copied once into shared memory; the workers attach to it
+when they start, so a job only sends names and a fold number to its worker instead of pickling
+the data. Jobs are submitted longest-first (LPT scheduling), by expected cost per model, so the
+slow models (RandomForest, SVR, ...) start right away and the quick ones fill the gaps at the
+end instead of leaving workers idle behind one long straggler:
+
+    records = model_comparison.compare('mohs', X, y, n_workers=4)
+    model_comparison.summarize(records).to_csv('results.csv', index=False)
+
+Each record holds one fold of one model: loss, fit and predict time, the peak memory the
+job added to its worker and the hash of the model's configuration (records can be appended to
+a ds_utils.experiment_log as they come in). `summarize` condenses them into the shape of
+data/mohs_hardness/results.csv. XGBoost and LightGBM models are skipped if not installed.
+"""
+import importlib.util
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn import ensemble, linear_model, svm
+from sklearn.metrics import median_absolute_error, roc_auc_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Local imports
+from ds_utils.approx_svr import ApproxSVR
+from ds_utils.experiment_log import config_hash
+from ds_utils.smoker_features import SmokerFeatures
+
+# Settings
+N_SPLITS = 5
+SEED = 0
+MEMORY_SAMPLE_INTERVAL = 0.005
+
+
+@dataclass
+class Model:
+    make: callable
+    cost: float                     # expected relative runtime, only used to order the jobs
+    group: str = 'Shallow'
+    requires: str = None            # optional package the model needs
+
+
+@dataclass
+class Task:
+    target: str
+    classification: bool
+    preprocess: callable
+    models: dict = field(default_factory=dict)
+
+    def loss(self, y_true, y_pred):
+        # Lower is better for both; for the classifier that's 1 - ROC AUC
+        if self.classification:
+            return 1 - roc_auc_score(y_true, y_pred)
+        return median_absolute_error(y_true, y_pred)
+
+    def folds(self, y, n_splits=N_SPLITS, seed=SEED):
+        splitter = (StratifiedKFold if self.classification else KFold)(n_splits, shuffle=True, random_state=seed)
+        return list(splitter.split(np.zeros(len(y)), y))
+
+    def available(self):
+        return {name: m for name, m in self.models.items()
+                if m.requires is None or importlib.util.find_spec(m.requires) is not None}
+
+
+def _xgb(kind, **params):
+    import xgboost
+    return getattr(xgboost, kind)(n_jobs=1, **params)
+
+
+def _lgbm(kind, **params):
+    import lightgbm
+    return getattr(lightgbm, kind)(n_jobs=1, verbose=-1, **params)
+
+
+TASKS = {
+    'smoker': Task('smoking', True, lambda: [SmokerFeatures(), StandardScaler()], {
+        'LogisticRegression': Model(lambda: linear_model.LogisticRegression(max_iter=1000), 1),
+        'LinearSVC': Model(lambda: svm.LinearSVC(), 20),
+        'RandomForestClassifier': Model(lambda: ensemble.RandomForestClassifier(n_jobs=1, random_state=SEED), 100),
+        'AdaBoostClassifier': Model(lambda: ensemble.AdaBoostClassifier(random_state=SEED), 60),
+        'HistGradientBoostingClassifier': Model(lambda: ensemble.HistGradientBoostingClassifier(random_state=SEED), 3),
+        'ExtraTreesClassifier': Model(lambda: ensemble.ExtraTreesClassifier(n_jobs=1, random_state=SEED), 60),
+        'XGBClassifier': Model(lambda: _xgb('XGBClassifier', random_state=SEED), 3, requires='xgboost'),
+        'LGBMClassifier': Model(lambda: _lgbm('LGBMClassifier', random_state=SEED), 2, requires='lightgbm'),
+    }),
+    # Costs from the runtimes in data/mohs_hardness/results.csv
+    'mohs': Task('Hardness', False, lambda: [StandardScaler()], {
+        'LinearRegression': Model(lambda: linear_model.LinearRegression(), 0.14),
+        'XGBRegressor': Model(lambda: _xgb('XGBRegressor', random_state=SEED), 2.3, requires='xgboost'),
+        'RandomForestRegressor': Model(lambda: ensemble.RandomForestRegressor(n_jobs=1, random_state=SEED), 66.6),
+        'LGBMRegressor': Model(lambda: _lgbm('LGBMRegressor', random_state=SEED), 1.3, requires='lightgbm'),
+        'SVR': Model(lambda: svm.SVR(), 50.6),
+        'ApproxSVR': Model(lambda: ApproxSVR(random_state=SEED), 8),
+    }),
+}
+
+
+def make_pipeline_for(task, model_name):
+    task = TASKS[task] if isinstance(task, str) else task
+    return make_pipeline(*task.preprocess(), task.models[model_name].make())
+
+
+class PeakMemory:
+    """Peak RSS (MB) added while the block runs, sampled in a background thread."""
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = 0.0
+
+    @staticmethod
+    def rss_mb():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._peak = max(self._peak, self.rss_mb())
+
+    def __enter__(self):
+        self._baseline = self._peak = self.rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak_mb = max(self._peak, self.rss_mb()) - self._baseline
+
+
+class SharedArrays:
+    """numpy arrays copied once into shared memory; `specs` lets other processes attach to them."""
+
+    def __init__(self, **arrays):
+        self._blocks = []
+        self.specs = {}
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+_worker_arrays = {}
+
+
+def _attach(specs, start_method):
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        # Only the creating process may unlink the block (Python < 3.13 has no track=False). A
+        # forked worker shares the parent's resource tracker, anything else gets its own.
+        if start_method != 'fork':
+            resource_tracker.unregister(block._name, 'shared_memory')
+        _worker_arrays[key] = (block, np.ndarray(shape, dtype, buffer=block.buf))
+
+
+def _run_job(task_name, model_name, fold, n_splits, seed):
+    task = TASKS[task_name]
+    X, y = _worker_arrays['X'][1], _worker_arrays['y'][1]
+    train, test = task.folds(y, n_splits, seed)[fold]
+    model = make_pipeline_for(task, model_name)
+
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        model.fit(X[train], y[train])
+        fit_s = time.perf_counter() - start
+        start = time.perf_counter()
+        if not task.classification:
+            pred = model.predict(X[test])
+        elif hasattr(model, 'predict_proba'):
+            pred = model.predict_proba(X[test])[:, 1]
+        else:
+            pred = model.decision_function(X[test])
+        predict_s = time.perf_counter() - start
+
+    return {
+        'task': task_name,
+        'model': model_name,
+        'group': task.models[model_name].group,
+        'fold': fold,
+        'loss': float(task.loss(y[test], pred)),
+        'fit_s': fit_s,
+        'predict_s': predict_s,
+        'peak_mem_mb': memory.peak_mb,
+        'worker': os.getpid(),
+        'config_hash': config_hash(model),
+    }
+
+
+def schedule(task, models=None, n_splits=N_SPLITS, costs=None):
+    """All (model, fold) jobs, longest expected runtime first.
+
+    `costs` ({model: seconds per fold}, e.g. measured by a previous run) override the defaults.
+    """
+    task = TASKS[task] if isinstance(task, str) else task
+    names = models or list(task.available())
+    costs = {name: task.models[name].cost for name in names} | {k: v for k, v in (costs or {}).items() if k in names}
+    jobs = [(name, fold) for name in names for fold in range(n_splits)]
+    return sorted(jobs, key=lambda job: -costs[job[0]])
+
+
+def compare(task_name, X, y, models=None, n_splits=N_SPLITS, n_workers=None, seed=SEED, costs=None, on_record=None):
+    """Run every (model, fold) pair and return one record per pair (in order of completion).
+
+    `on_record` is called with each record as soon as its job is done.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    jobs = schedule(task_name, models, n_splits, costs)
+    records = []
+    start = time.perf_counter()
+    context = multiprocessing.get_context()
+    with SharedArrays(X=X, y=y) as shared, ProcessPoolExecutor(
+            n_workers or os.cpu_count(), context, initializer=_attach,
+            initargs=(shared.specs, context.get_start_method())) as pool:
+        futures = [pool.submit(_run_job, task_name, name, fold, n_splits, seed) for name, fold in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            record['finished_s'] = time.perf_counter() - start
+            records.append(record)
+            if on_record is not None:
+                on_record(record)
+    return records
+
+
+def summarize(records):
+    """Per model: mean/std of the fold losses and the total runtime, shaped like results.csv."""
+    df = pd.DataFrame(records)
+    df['runtime'] = df['fit_s'] + df['predict_s']
+    summary = df.groupby('model', sort=False).agg(
+        loss_mean=('loss', 'mean'), loss_std=('loss', lambda s: s.std(ddof=0)), runtime=('runtime', 'sum'),
+        group=('group', 'first'),
+    ).reset_index()
+    summary.columns = ['Model Name', 'Loss Mean', 'Loss Std', 'Runtime', 'Group']
+    return summary.sort_values('Loss Mean', ascending=False, ignore_index=True)
+
+
+def costs_from(records):
+    """Measured seconds per fold of each model, to schedule the next run with."""
+    df = pd.DataFrame(records)
+    return (df['fit_s'] + df['predict_s']).groupby(df['model']).mean().to_dict()
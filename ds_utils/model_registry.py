@@ -0,0 +1,144 @@
+"""Lazy, size-bounded registry of the per-location weather models.
+
+Each model is stored as its own uncompressed joblib file, `<models dir>/<name>.joblib`, so
+opening the registry costs a directory listing rather than unpickling all 49 models. A model
+is loaded on its first request, with its numpy arrays memory-mapped read-only (so processes
+share the pages through the OS page cache), and kept in an LRU that evicts the least recently
+used models as soon as their total file size exceeds `max_bytes`:
+
+    registry = model_registry.open_registry()
+    model = registry.get('Sydney')
+    registry.stats()    # hits, misses, hit rate, latencies of the last LOAD_HISTORY loads, ...
+
+Populate it with `registry.save(name, model)`; `python -m ds_utils.model_registry` lists it.
+"""
+import argparse
+import functools
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import joblib
+
+# Local imports
+from ds_utils.sized_lru import SizedLRU
+
+# Paths
+MODELS_PATH = 'data/australian_weather/models'
+
+# Settings
+MODEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+SUFFIX = '.joblib'
+LOAD_HISTORY = 1000                         # load latencies kept for the stats
+
+
+class ModelRegistry:
+
+    def __init__(self, path=MODELS_PATH, max_bytes=MODEL_CACHE_MAX_BYTES, mmap=True):
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+        self._lru = SizedLRU(max_bytes)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = deque(maxlen=LOAD_HISTORY)
+
+    def _file(self, name):
+        return os.path.join(self.path, name + SUFFIX)
+
+    def names(self):
+        """Names of all stored models, without loading any of them."""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(entry.name[:-len(SUFFIX)] for entry in os.scandir(self.path) if entry.name.endswith(SUFFIX))
+
+    def __contains__(self, name):
+        return os.path.isfile(self._file(name))
+
+    def __len__(self):
+        return len(self.names())
+
+    def version(self, name):
+        """mtime of the stored model, for use as a cache key (None if there is none)."""
+        try:
+            return os.stat(self._file(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def save(self, name, model):
+        """Store `model` under `name`, replacing (and un-caching) a previous version atomically."""
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(name) + '.tmp'
+        joblib.dump(model, tmp)
+        os.replace(tmp, self._file(name))
+        with self._lock:
+            self._lru.discard(name)
+        return os.path.getsize(self._file(name))
+
+    def get(self, name):
+        """The model stored under `name`; raises KeyError if there is none."""
+        try:
+            stat = os.stat(self._file(name))
+        except FileNotFoundError:
+            raise KeyError(name) from None
+        with self._lock:
+            entry = self._lru.get(name)
+            if entry is not None and entry['mtime_ns'] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry['model']
+
+            self.misses += 1
+            start = time.perf_counter()
+            model = joblib.load(self._file(name), mmap_mode=self.mmap_mode)
+            self.load_seconds.append(time.perf_counter() - start)
+            self._lru.put(name, {'model': model, 'nbytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+            return model
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            loads = self.load_seconds
+            return {
+                'models': len(self.names()),
+                'loaded': len(self._lru),
+                'nbytes': self._lru.nbytes,
+                'max_bytes': self._lru.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else None,
+                'evictions': self._lru.evictions,
+                'load_ms_median': 1000 * statistics.median(loads) if loads else None,
+                'load_ms_max': 1000 * max(loads) if loads else None,
+            }
+
+
+@functools.lru_cache(maxsize=None)
+def open_registry(path=MODELS_PATH):
+    """The process-wide registry of `path`, so that all callers share one LRU."""
+    return ModelRegistry(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the stored models and time loading each of them once.')
+    parser.add_argument('--path', default=MODELS_PATH)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.path)
+    start = time.perf_counter()
+    names = registry.names()
+    print(f'{len(names)} models in {args.path}, listed in {1000 * (time.perf_counter() - start):.1f}ms')
+    for name in names:
+        model = registry.get(name)
+        print(f'{name:<20} {os.path.getsize(registry._file(name)) / 1024:>8.0f}KB  {type(model).__name__}')
+    for key, value in registry.stats().items():
+        print(f'{key:<16} {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""The deep-stacking Mohs hardness model, and batch scoring of CSV files with it in chunks.
+
+The model is the notebook's 'DNNStackAll': the base estimators of ds_utils.model_comparison
+(SVR, random forest, XGBoost and LightGBM, as far as installed), whose out-of-fold predictions
+are fed, together with the original features, into a small neural network (sklearn's MLP in
+place of the notebook's Keras network). It's stored in its own model registry:
+
+    python -m ds_utils.mohs_models --csv train.csv
+    python -m ds_utils.mohs_models --score test.csv predictions.csv
+
+Scoring reads the input `chunksize` rows at a time and appends each chunk's predictions to the
+output, so its memory stays bounded by the chunk size, however large the file. Rows with missing
+or non-numeric features raise a ValueError naming the first of them:
+
+    mohs_models.score_csv(mohs_models.get(), 'test.csv', 'predictions.csv')
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import StackingRegressor
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Local imports
+from ds_utils import model_comparison
+from ds_utils.model_registry import open_registry
+
+# Paths
+MODELS_PATH = 'data/mohs_hardness/models'
+
+# Settings
+MODEL_NAME = 'DNNStackAll'
+TARGET = 'Hardness'
+FEATURE_COLUMNS = [
+    'allelectrons_Total', 'density_Total', 'allelectrons_Average', 'val_e_Average', 'atomicweight_Average',
+    'ionenergy_Average', 'el_neg_chi_Average', 'R_vdw_element_Average', 'R_cov_element_Average', 'zaratio_Average',
+    'density_Average',
+]
+STACK_BASES = ['SVR', 'RandomForestRegressor', 'XGBRegressor', 'LGBMRegressor']
+CHUNKSIZE = 10_000
+
+
+def make_deep_stack():
+    task = model_comparison.TASKS['mohs']
+    bases = [name for name in STACK_BASES if name in task.available()]
+    network = make_pipeline(StandardScaler(), MLPRegressor(hidden_layer_sizes=(64, 32), early_stopping=True,
+                                                           random_state=model_comparison.SEED))
+    return StackingRegressor([(name, model_comparison.make_pipeline_for(task, name)) for name in bases], network,
+                             passthrough=True)
+
+
+def train(df, models_path=MODELS_PATH):
+    """Fit the deep stack on all rows of `df` and store it; returns the seconds it took."""
+    start = time.perf_counter()
+    model = make_deep_stack().fit(df[FEATURE_COLUMNS].to_numpy(dtype=np.float32), df[TARGET].to_numpy())
+    seconds = time.perf_counter() - start
+    open_registry(models_path).save(MODEL_NAME, model)
+    return seconds
+
+
+def exists(models_path=MODELS_PATH):
+    return MODEL_NAME in open_registry(models_path)
+
+
+def get(models_path=MODELS_PATH):
+    return open_registry(models_path).get(MODEL_NAME)
+
+
+def version(models_path=MODELS_PATH):
+    return open_registry(models_path).version(MODEL_NAME)
+
+
+def missing_columns(columns):
+    return [c for c in FEATURE_COLUMNS if c not in columns]
+
+
+def score_chunks(model, chunks):
+    """Yield a DataFrame of predictions (with the 'id' column, if there is one) per non-empty chunk."""
+    for chunk in chunks:
+        missing = missing_columns(chunk.columns)
+        if missing:
+            raise ValueError(f'missing columns: {", ".join(missing)}')
+        if chunk.empty:
+            continue
+        features = chunk[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+        invalid = features.isna().any(axis=1).to_numpy()
+        if invalid.any():
+            # read_csv numbers the rows of all chunks consecutively; line 1 is the header
+            raise ValueError(f'missing or non-numeric values in line {chunk.index[invalid][0] + 2} '
+                             f'({invalid.sum():,} such rows among lines {chunk.index[0] + 2}-{chunk.index[-1] + 2})')
+        prediction = model.predict(features.to_numpy(dtype=np.float32))
+        scored = pd.DataFrame({TARGET: prediction}, index=chunk.index)
+        if 'id' in chunk:
+            scored.insert(0, 'id', chunk['id'])
+        yield scored
+
+
+def score_csv(model, source, output, chunksize=CHUNKSIZE, on_chunk=None):
+    """Score the CSV `source` (path or file object) chunk by chunk into the CSV `output`.
+
+    `on_chunk` is called with the number of rows scored so far after every chunk. Returns
+    (rows, seconds); an `output` path is removed again if scoring fails halfway.
+    """
+    start = time.perf_counter()
+    rows = 0
+    chunks = pd.read_csv(source, chunksize=chunksize)
+    try:
+        for i, scored in enumerate(score_chunks(model, chunks)):
+            scored.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(scored)
+            if on_chunk is not None:
+                on_chunk(rows)
+    except BaseException:
+        if isinstance(output, str) and os.path.exists(output):
+            os.remove(output)
+        raise
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the deep-stacking Mohs hardness model, or score a CSV with it.')
+    parser.add_argument('--csv', help='the competition training data (train.csv)')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a random table of this many rows instead')
+    parser.add_argument('--score', nargs=2, metavar=('INPUT', 'OUTPUT'), help='score INPUT with the stored model')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    if args.score:
+        rows, seconds = score_csv(get(), *args.score, chunksize=args.chunksize)
+        print(f'{rows:,} rows scored in {seconds:.1f}s ({rows / seconds:,.0f} rows/s), saved to {args.score[1]}')
+        return
+    if args.csv:
+        df = pd.read_csv(args.csv)
+    elif args.synthetic:
+        from scripts.compare_models import synthetic
+        X, y = synthetic('mohs', args.synthetic)
+        df = X.assign(**{TARGET: y})
+    else:
+        parser.error('pass --csv, --synthetic or --score')
+    seconds = train(df)
+    print(f'{MODEL_NAME} trained in {seconds:.1f}s, saved to {MODELS_PATH}')
+
+
+if __name__ == '__main__':
+    main()
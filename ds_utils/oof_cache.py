@@ -0,0 +1,164 @@
+"""Content-addressed cache of out-of-fold (OOF) predictions, for voting and (deep) stacking.
+
+Stacked models are trained on the OOF predictions of their base estimators, and those are by far
+the expensive part. Here they're computed once and stored on disk under a key made of
+    - the estimator: class path and all (nested) parameters
+    - the data: a hash of the bytes of X and y
+    - the split: a hash of the test indices of every fold
+so trying another final estimator, DNN variant or voting weights reuses them, while any change
+to the estimator, the data or the folds yields a new key (no manual invalidation needed).
+
+Every entry also remembers what it originally cost to compute, which gives two runtimes for a
+stacked model: the end-to-end cost of the whole pipeline (base estimators included, whether
+cached or not) and the incremental cost actually paid now:
+
+    cache = OOFCache()
+    ledger = CostLedger()
+    oof = cache.predictions(estimator, X, y, folds, ledger=ledger)
+    ledger.end_to_end_s, ledger.incremental_s
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from scipy.special import expit
+from sklearn.base import clone, is_classifier
+
+# Paths
+CACHE_PATH = 'data/oof_cache'
+
+# Settings
+FORMAT = 2                  # part of every key; bumped when what's stored changes (2: squashed decision values)
+
+
+def estimator_key(estimator):
+    """Class path plus all parameters, nested estimators included, as a canonical string."""
+    def canonical(value):
+        if hasattr(value, 'get_params'):
+            params = value.get_params(deep=False)
+            return {'class': f'{type(value).__module__}.{type(value).__qualname__}',
+                    'params': {k: canonical(v) for k, v in sorted(params.items())}}
+        if isinstance(value, (list, tuple)):
+            return [canonical(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): canonical(v) for k, v in sorted(value.items())}
+        if callable(value):
+            return f'{getattr(value, "__module__", "")}.{getattr(value, "__qualname__", repr(value))}'
+        return repr(value)
+    return json.dumps(canonical(estimator), sort_keys=True)
+
+
+def data_hash(*arrays):
+    h = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(f'{array.dtype.str}{array.shape};'.encode())
+        h.update(memoryview(array).cast('B'))
+    return h.hexdigest()
+
+
+def folds_hash(folds):
+    return data_hash(*[np.asarray(test, dtype=np.int64) for _, test in folds])
+
+
+def predict_scores(model, X):
+    """Predictions for regressors, positive-class probabilities for classifiers.
+
+    Decision values (LinearSVC) are squashed into (0, 1) by the logistic function, so they don't
+    outweigh the probabilities of the other estimators when averaged by a voting model.
+    """
+    if not is_classifier(model):
+        return model.predict(X)
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        return proba[:, 1] if proba.shape[1] == 2 else proba
+    return expit(model.decision_function(X))
+
+
+class CostLedger:
+    """End-to-end vs. incremental seconds of everything computed through it."""
+
+    def __init__(self):
+        self.end_to_end_s = 0.0
+        self.incremental_s = 0.0
+        self.entries = []
+
+    def add(self, name, compute_s, elapsed_s, cached):
+        self.end_to_end_s += compute_s
+        self.incremental_s += elapsed_s
+        self.entries.append({'name': name, 'compute_s': compute_s, 'elapsed_s': elapsed_s, 'cached': cached})
+
+    def timed(self, name):
+        """Context manager for work that isn't cached, e.g. fitting the final estimator."""
+        ledger = self
+
+        class Timer:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc):
+                elapsed = time.perf_counter() - self.start
+                ledger.add(name, elapsed, elapsed, False)
+        return Timer()
+
+
+class OOFCache:
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, estimator, X, y, folds):
+        parts = [str(FORMAT), estimator_key(estimator), data_hash(X, y), folds_hash(folds)]
+        return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + '.npz')
+
+    def predictions(self, estimator, X, y, folds, name=None, ledger=None):
+        """OOF predictions of `estimator` over `folds` ([(train, test), ...]), from the cache if possible."""
+        name = name or type(estimator).__name__
+        start = time.perf_counter()
+        file = self._file(self.key(estimator, X, y, folds))
+        if os.path.exists(file):
+            with np.load(file) as f:
+                oof, compute_s = f['oof'], float(f['compute_s'])
+            self.hits += 1
+            if ledger is not None:
+                ledger.add(name, compute_s, time.perf_counter() - start, True)
+            return oof
+
+        self.misses += 1
+        oof = None
+        for train, test in folds:
+            model = clone(estimator).fit(X[train], y[train])
+            pred = predict_scores(model, X[test])
+            if oof is None:
+                oof = np.full((len(X),) + pred.shape[1:], np.nan, dtype=np.float64)
+            oof[test] = pred
+        compute_s = time.perf_counter() - start
+
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = file + '.tmp.npz'
+        np.savez(tmp, oof=oof, compute_s=compute_s, estimator=estimator_key(estimator), created=time.time())
+        os.replace(tmp, file)
+        if ledger is not None:
+            ledger.add(name, compute_s, time.perf_counter() - start, False)
+        return oof
+
+    def stack(self, estimators, X, y, folds, ledger=None):
+        """Column-stacked OOF predictions of `estimators` ({name: estimator})."""
+        columns = [self.predictions(est, X, y, folds, name, ledger) for name, est in estimators.items()]
+        return np.column_stack([c.reshape(len(X), -1) for c in columns])
+
+    def info(self):
+        entries = nbytes = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith('.npz'):
+                    entries += 1
+                    nbytes += os.path.getsize(os.path.join(root, name))
+        return {'entries': entries, 'nbytes': nbytes, 'hits': self.hits, 'misses': self.misses}
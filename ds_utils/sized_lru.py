@@ -0,0 +1,53 @@
+"""LRU of entries with a size in bytes, evicting the least recently used ones as soon as their
+total exceeds `max_bytes`.
+
+Shared by the asset cache of st_utils and ds_utils.model_registry. Entries are dicts with an
+'nbytes' item, next to whatever else their owner keeps in them. It's not thread safe on its
+own: its owners already hold a lock around every lookup and insert.
+
+    lru = SizedLRU(max_bytes)
+    lru.put(key, {'value': value, 'nbytes': 1024})
+    entry = lru.get(key)        # None if there is none; marks it as the most recently used
+"""
+from collections import OrderedDict
+
+
+class SizedLRU:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key):
+        """Like `get`, without counting as a use."""
+        return self._entries.get(key)
+
+    def put(self, key, entry):
+        self.discard(key)
+        self._entries[key] = entry
+        self.nbytes += entry['nbytes']
+        # Never evict the entry that was just added, even if it alone exceeds the budget
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted['nbytes']
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry['nbytes']
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
@@ -0,0 +1,88 @@
+"""Quantile transformation of skewed columns, fitted into bounded-memory sketches.
+
+sklearn's QuantileTransformer sorts (a subsample of) every column and keeps `n_quantiles`
+reference values per column. Here every column is summarized by the mergeable quantile sketch
+of ds_utils.drift_sketch instead: at most ~`compression` weighted centroids, whatever the
+number of rows, filled chunk by chunk with `partial_fit` and combined across workers with
+`merge`. `transform` maps a value to its approximate mid-rank (the sketch's CDF), optionally
+followed by the standard normal quantile function, like
+QuantileTransformer(output_distribution='normal'):
+
+    scaler = SketchQuantileTransformer(columns=[INPUT_COLUMNS.index(c) for c in skewed])
+    for chunk in pd.read_csv('train.csv', chunksize=50_000):
+        scaler.partial_fit(chunk[INPUT_COLUMNS])
+    X_scaled = scaler.transform(X)
+
+Columns not in `columns` are passed through unchanged; NaN stays NaN.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+# Local imports
+from ds_utils.drift_sketch import COMPRESSION, FeatureSketch
+
+# Settings
+BLOCK_ROWS = 65_536
+BOUNDS = 1e-7                       # same clipping as sklearn's QuantileTransformer before ppf
+
+
+def _as_float64(X):
+    if isinstance(X, pd.DataFrame):
+        X = X.to_numpy(dtype=np.float64)
+    return np.asarray(X, dtype=np.float64)
+
+
+class SketchQuantileTransformer(TransformerMixin, BaseEstimator):
+    """Input/output: 2d array (or DataFrame); `columns` are the indices to transform (default all)."""
+
+    def __init__(self, columns=None, output_distribution='normal', compression=COMPRESSION, block_rows=BLOCK_ROWS):
+        self.columns = columns
+        self.output_distribution = output_distribution
+        self.compression = compression
+        self.block_rows = block_rows
+
+    def fit(self, X, y=None):
+        for name in ['columns_', 'sketches_']:
+            self.__dict__.pop(name, None)
+        X = _as_float64(X)
+        for start in range(0, len(X), self.block_rows):
+            self.partial_fit(X[start:start + self.block_rows])
+        return self
+
+    def partial_fit(self, X, y=None):
+        X = _as_float64(X)
+        if not hasattr(self, 'sketches_'):
+            self.n_features_in_ = X.shape[1]
+            self.columns_ = np.arange(X.shape[1]) if self.columns is None else np.asarray(self.columns)
+            self.sketches_ = [FeatureSketch([], self.compression) for _ in self.columns_]
+        for sketch, j in zip(self.sketches_, self.columns_):
+            sketch.update(X[:, j])
+        return self
+
+    def merge(self, other):
+        """A transformer fitted on the data of both (e.g. of two workers)."""
+        check_is_fitted(self, 'sketches_')
+        merged = copy.copy(self)
+        merged.sketches_ = [a.merge(b) for a, b in zip(self.sketches_, other.sketches_)]
+        return merged
+
+    def transform(self, X):
+        check_is_fitted(self, 'sketches_')
+        out = _as_float64(X).copy()
+        for sketch, j in zip(self.sketches_, self.columns_):
+            u = np.clip(sketch.cdf(out[:, j]), BOUNDS, 1 - BOUNDS)
+            out[:, j] = ndtri(u) if self.output_distribution == 'normal' else u
+        return out
+
+    def inverse_transform(self, X):
+        check_is_fitted(self, 'sketches_')
+        out = _as_float64(X).copy()
+        for sketch, j in zip(self.sketches_, self.columns_):
+            u = ndtr(out[:, j]) if self.output_distribution == 'normal' else out[:, j]
+            out[:, j] = sketch.quantile(u)
+        return out
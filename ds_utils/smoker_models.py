@@ -0,0 +1,162 @@
+"""Trained smoker status models and the holdout set they're evaluated on.
+
+The pipelines of ds_utils.model_comparison (SmokerFeatures, scaling, classifier) are fitted on
+a stratified training split and stored in their own model registry, one file per model; the
+remaining rows are kept as the holdout set in data/smoker_status/holdout.parquet. A stacking
+model (the available boosting models under a logistic regression) is trained alongside, and
+every tree-based model is also exported by ds_utils.flat_trees into a second registry, which
+the page's prediction form scores with numpy alone, without importing LightGBM or XGBoost. The
+flat exports are derived data, which `--export-flat` regenerates from the stored models (the
+page only reads them). The Smoker page evaluates whatever models it finds there:
+
+    python -m ds_utils.smoker_models --csv train.csv
+    python -m ds_utils.smoker_models --synthetic 40000 --models LogisticRegression HistGradientBoostingClassifier
+    python -m ds_utils.smoker_models --export-flat
+
+    smoker_models.names()                       # available models
+    model = smoker_models.get('LogisticRegression')
+    X, y = smoker_models.load_holdout()
+    rest, X_features, columns = smoker_models.engineered(model, X)
+    smoker_models.get_flat('StackingClassifier').predict_proba(X)
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+from sklearn.ensemble import StackingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+# Local imports
+from ds_utils import flat_trees, model_comparison
+from ds_utils.model_registry import open_registry
+from ds_utils.smoker_features import INPUT_COLUMNS, OUTPUT_COLUMNS, SmokerFeatures
+
+# Paths
+MODELS_PATH = 'data/smoker_status/models'
+FLAT_MODELS_PATH = 'data/smoker_status/flat_models'
+HOLDOUT_PATH = 'data/smoker_status/holdout.parquet'
+
+# Settings
+TARGET = 'smoking'
+HOLDOUT_SIZE = 0.2
+SEED = 0
+STACK_NAME = 'StackingClassifier'
+STACK_BASES = ['LGBMClassifier', 'XGBClassifier', 'HistGradientBoostingClassifier']
+
+
+def make_stack(task):
+    """The available STACK_BASES stacked on their out-of-fold probabilities by a logistic regression."""
+    bases = [name for name in STACK_BASES if name in task.available()]
+    return StackingClassifier([(name, model_comparison.make_pipeline_for(task, name)) for name in bases],
+                              LogisticRegression(), stack_method='predict_proba')
+
+
+def train(df, models=None, stack=True, holdout_size=HOLDOUT_SIZE, models_path=MODELS_PATH,
+          flat_models_path=FLAT_MODELS_PATH, holdout_path=HOLDOUT_PATH):
+    """Fit the pipelines of `models` (default: all available) and the stacking model, store them
+    with the holdout set and their flat exports."""
+    task = model_comparison.TASKS['smoker']
+    train_df, holdout = train_test_split(df[INPUT_COLUMNS + [TARGET]], test_size=holdout_size,
+                                         stratify=df[TARGET], random_state=SEED)
+    makers = {name: lambda name=name: model_comparison.make_pipeline_for(task, name)
+              for name in models or task.available()}
+    if stack:
+        makers[STACK_NAME] = lambda: make_stack(task)
+    registry, flat_registry = open_registry(models_path), open_registry(flat_models_path)
+    seconds = {}
+    for name, make in makers.items():
+        start = time.perf_counter()
+        model = make().fit(train_df[INPUT_COLUMNS], train_df[TARGET])
+        seconds[name] = time.perf_counter() - start
+        registry.save(name, model)
+        _save_flat(flat_registry, name, model)
+
+    os.makedirs(os.path.dirname(holdout_path), exist_ok=True)
+    holdout.reset_index(drop=True).to_parquet(holdout_path + '.tmp', index=False)
+    os.replace(holdout_path + '.tmp', holdout_path)
+    return seconds
+
+
+def _save_flat(flat_registry, name, model):
+    try:
+        flat_registry.save(name, flat_trees.export(model))
+        return True
+    except ValueError:
+        return False                    # not a tree ensemble (or stack of them)
+
+
+def export_flat(models_path=MODELS_PATH, flat_models_path=FLAT_MODELS_PATH):
+    """(Re-)export the stored models into the flat registry; returns the names exported."""
+    registry, flat_registry = open_registry(models_path), open_registry(flat_models_path)
+    return [name for name in registry.names() if _save_flat(flat_registry, name, registry.get(name))]
+
+
+def names(models_path=MODELS_PATH, holdout_path=HOLDOUT_PATH):
+    """Stored models (none without a holdout set to evaluate them on)."""
+    return open_registry(models_path).names() if os.path.exists(holdout_path) else []
+
+
+def get(name, models_path=MODELS_PATH):
+    return open_registry(models_path).get(name)
+
+
+def flat_names(flat_models_path=FLAT_MODELS_PATH):
+    return open_registry(flat_models_path).names()
+
+
+def get_flat(name, flat_models_path=FLAT_MODELS_PATH):
+    """The flat_trees.FlatModel of a stored model."""
+    return open_registry(flat_models_path).get(name)
+
+
+def version(name, models_path=MODELS_PATH, holdout_path=HOLDOUT_PATH):
+    """Changes whenever the model or the holdout set is replaced, for use as a cache key."""
+    return open_registry(models_path).version(name), os.stat(holdout_path).st_mtime_ns
+
+
+def load_holdout(holdout_path=HOLDOUT_PATH):
+    df = pd.read_parquet(holdout_path)
+    return df[INPUT_COLUMNS], df[TARGET].to_numpy()
+
+
+def engineered(model, X):
+    """(rest of the pipeline, X with the engineered features, their names)
+
+    Splits off the SmokerFeatures step, so the engineered features can be looked at (and
+    permuted) on their own, and are computed once instead of on every prediction.
+    """
+    if isinstance(model[0], SmokerFeatures):
+        return model[1:], model[0].transform(X), OUTPUT_COLUMNS
+    return model, X, list(X.columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the smoker status models and store them with a holdout set.')
+    parser.add_argument('--csv', help='the competition training data (train.csv)')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a random table of this many rows instead')
+    parser.add_argument('--models', nargs='+', help='subset of the models to train')
+    parser.add_argument('--no-stack', action='store_true', help=f'skip the {STACK_NAME}')
+    parser.add_argument('--export-flat', action='store_true', help='only re-export the stored models to flat arrays')
+    args = parser.parse_args(argv)
+
+    if args.export_flat:
+        print(f'exported {", ".join(export_flat()) or "no models"} to {FLAT_MODELS_PATH}')
+        return
+    if args.csv:
+        df = pd.read_csv(args.csv)
+    elif args.synthetic:
+        from scripts.compare_models import synthetic
+        X, y = synthetic('smoker', args.synthetic)
+        df = X.assign(**{TARGET: y})
+    else:
+        parser.error('pass --csv, --synthetic or --export-flat')
+
+    for name, seconds in train(df, args.models, stack=not args.no_stack).items():
+        print(f'{name:<32} trained in {seconds:.1f}s')
+    print(f'models in {MODELS_PATH} (flat exports in {FLAT_MODELS_PATH}), {HOLDOUT_SIZE:.0%} holdout in {HOLDOUT_PATH}')
+
+
+if __name__ == '__main__':
+    main()
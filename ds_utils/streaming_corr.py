@@ -0,0 +1,201 @@
+"""Pearson and Spearman correlation matrices in a streaming, mergeable pass over chunks.
+
+For every pair of columns (i, j) a `Comoments` keeps, over the rows where both are present,
+the count, the two means, the two sums of squared deviations and the co-moment. A chunk is
+reduced to these with a few matrix products (shifted by its column means first, so nothing
+large is subtracted from anything large) and folded in with Chan's pairwise update, which is
+also how two Comoments of different chunks, files or processes merge. Any subset of columns
+can be read off afterwards without touching the data again:
+
+    pearson, spearman = streaming_corr.correlations(lambda: pd.read_csv('train.csv', chunksize=100_000))
+    pearson.corr(['age', 'height(cm)', 'hemoglobin'])
+
+Spearman takes a second pass: the first one also fills a quantile sketch per column
+(ds_utils.drift_sketch), the second turns every value into its approximate rank (its CDF) and
+correlates those. The results are saved per dataset and, for the weather store, per version:
+
+    python -m ds_utils.streaming_corr data/smoker_status/correlations.npz train.csv
+    python -m ds_utils.streaming_corr data/australian_weather/correlations.npz --store
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils import drift_sketch, weather_store
+
+# Paths
+CORRELATION_PATHS = {
+    'smoker': 'data/smoker_status/correlations.npz',
+    'mohs': 'data/mohs_hardness/correlations.npz',
+    'weather': 'data/australian_weather/correlations.npz',
+}
+
+# Settings
+CHUNKSIZE = 100_000
+LOCATIONS_PER_CHUNK = 8
+METHODS = ['pearson', 'spearman']
+WEATHER_COLUMNS = weather_store.MEASUREMENTS + ['RainToday', 'RainTomorrow']
+STATS = ['n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy']
+
+
+class Comoments:
+    """Pairwise-complete count, means, squared deviations and co-moments, all (k, k)."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        for name in STATS:
+            setattr(self, name, np.zeros((k, k)))
+
+    @classmethod
+    def of_chunk(cls, columns, X):
+        X = np.asarray(X, dtype=np.float64)
+        present = ~np.isnan(X)
+        W = present.astype(np.float64)
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(np.where(present.any(axis=0), X, 0), axis=0))
+        Z = np.where(present, X - shift, 0)
+
+        stats = cls(columns)
+        stats.n = W.T @ W
+        sum_x = Z.T @ W                 # [i, j]: sum of column i over the rows where j is present too
+        sum_xx = (Z * Z).T @ W
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_x = np.where(stats.n > 0, sum_x / stats.n, 0)
+        stats.mean_x = mean_x + shift[:, None]
+        stats.mean_y = mean_x.T + shift[None, :]
+        stats.m2_x = sum_xx - sum_x * mean_x
+        stats.m2_y = stats.m2_x.T
+        stats.c_xy = Z.T @ Z - sum_x * mean_x.T
+        return stats
+
+    def merge(self, other):
+        merged = Comoments(self.columns)
+        n = self.n + other.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(n > 0, other.n / n, 0)
+        d_x, d_y = other.mean_x - self.mean_x, other.mean_y - self.mean_y
+        weight = self.n * share
+        merged.n = n
+        merged.mean_x = self.mean_x + d_x * share
+        merged.mean_y = self.mean_y + d_y * share
+        merged.m2_x = self.m2_x + other.m2_x + d_x * d_x * weight
+        merged.m2_y = self.m2_y + other.m2_y + d_y * d_y * weight
+        merged.c_xy = self.c_xy + other.c_xy + d_x * d_y * weight
+        return merged
+
+    def update(self, X):
+        merged = self.merge(Comoments.of_chunk(self.columns, X))
+        for name in STATS:
+            setattr(self, name, getattr(merged, name))
+        return self
+
+    def corr(self, columns=None):
+        """Correlation matrix (of `columns`, default all) as a DataFrame; NaN where undefined."""
+        columns = list(columns) if columns is not None else self.columns
+        idx = np.array([self.columns.index(c) for c in columns], dtype=int)
+        grid = np.ix_(idx, idx)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.c_xy[grid] / np.sqrt(self.m2_x[grid] * self.m2_y[grid])
+        r[self.n[grid] < 2] = np.nan
+        r = np.clip(r, -1, 1)
+        np.fill_diagonal(r, 1)
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+
+def _ranks(df, sketches):
+    return np.column_stack([
+        np.where(df[col].isna(), np.nan, sketch.cdf(df[col].to_numpy(dtype=np.float64)))
+        for col, sketch in sketches.items()
+    ])
+
+
+def correlations(make_chunks, columns=None):
+    """(pearson, spearman) Comoments of the DataFrames yielded by `make_chunks()` (called twice).
+
+    `columns` defaults to the numeric columns of the first chunk, without 'id'.
+    """
+    pearson = sketches = None
+    for chunk in make_chunks():
+        if pearson is None:
+            columns = columns or [c for c in chunk.select_dtypes('number').columns if c != 'id']
+            pearson = Comoments(columns)
+            sketches = {col: drift_sketch.FeatureSketch([]) for col in columns}
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        pearson.update(values)
+        for j, col in enumerate(columns):
+            sketches[col].update(values[:, j])
+
+    spearman = Comoments(columns)
+    for chunk in make_chunks():
+        spearman.update(_ranks(chunk, sketches))
+    return pearson, spearman
+
+
+def weather_chunks(store_path=weather_store.STORE_PATH, locations_per_chunk=LOCATIONS_PER_CHUNK):
+    """The store's measurements, with RainToday/RainTomorrow as 0/1, a few locations at a time."""
+    locations = weather_store.locations(store_path)
+    for i in range(0, len(locations), locations_per_chunk):
+        df = weather_store.load(WEATHER_COLUMNS, locations[i:i + locations_per_chunk], store_path=store_path)
+        for col in ['RainToday', 'RainTomorrow']:
+            df[col] = df[col].cat.codes.replace(-1, np.nan)
+        yield df
+
+
+def save(path, results, version=''):
+    arrays = {f'{method}_{name}': getattr(stats, name) for method, stats in zip(METHODS, results) for name in STATS}
+    np.savez(path + '.tmp.npz', columns=np.array(results[0].columns, dtype=str), version=version, **arrays)
+    os.replace(path + '.tmp.npz', path)
+
+
+def load(path):
+    """(version, (pearson, spearman))"""
+    with np.load(path) as f:
+        results = []
+        for method in METHODS:
+            stats = Comoments(f['columns'].tolist())
+            for name in STATS:
+                setattr(stats, name, f[f'{method}_{name}'])
+            results.append(stats)
+        return str(f['version']), tuple(results)
+
+
+def load_weather(store_path=weather_store.STORE_PATH, path=CORRELATION_PATHS['weather']):
+    """Correlations of the weather store's current version, recomputed if the store changed."""
+    version = weather_store.store_version(store_path)
+    if os.path.exists(path):
+        cached_version, results = load(path)
+        if cached_version == version:
+            return results
+    results = correlations(lambda: weather_chunks(store_path), WEATHER_COLUMNS)
+    save(path, results, version)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute and save the correlation matrices of a dataset.')
+    parser.add_argument('output', help='.npz file, e.g. ' + CORRELATION_PATHS['smoker'])
+    parser.add_argument('csv', nargs='*', help='CSV files, read in chunks one after another')
+    parser.add_argument('--store', action='store_true', help='use the weather store instead')
+    parser.add_argument('--columns', nargs='+', help='columns to correlate (default: numeric columns)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    if args.store:
+        results = load_weather(path=args.output)
+    elif args.csv:
+        def chunks():
+            for path in args.csv:
+                yield from pd.read_csv(path, chunksize=args.chunksize)
+        results = correlations(chunks, args.columns)
+        save(args.output, results)
+    else:
+        parser.error('pass CSV files or --store')
+    print(f'{len(results[0].columns)} columns, {int(results[0].n.max()):,} rows, saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
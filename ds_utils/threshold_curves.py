@@ -0,0 +1,92 @@
+"""Every decision threshold of a binary classifier, answered by binary search.
+
+The scores are sorted once and reduced to their distinct values (descending), each with the
+cumulative number of true and false positives scored at or above it. The confusion matrix at
+any threshold t is then one `searchsorted` away: the number of distinct scores >= t gives the
+index into the cumulative counts. That's O(log n) per threshold, for any number of thresholds
+at once, and everything else (precision, recall, FPR, F1, the ROC and PR curves, AUC) follows
+from the four counts:
+
+    curve = ThresholdCurve(y_true, y_score)
+    curve.at(0.5)                   # dict of tp, fp, fn, tn, precision, recall, fpr, f1, ...
+    curve.at(np.linspace(0, 1, 101))
+    curve.roc_auc(), curve.roc(), curve.pr()
+"""
+import numpy as np
+import pandas as pd
+
+# Settings
+MAX_CURVE_POINTS = 1000
+
+
+class ThresholdCurve:
+
+    def __init__(self, y_true, y_score):
+        y_true = np.asarray(y_true).astype(bool)
+        y_score = np.asarray(y_score, dtype=np.float64)
+        order = np.argsort(y_score, kind='stable')[::-1]
+        y_score, y_true = y_score[order], y_true[order]
+        # Last position of every distinct score in the descending order
+        last = np.r_[np.flatnonzero(np.diff(y_score)), len(y_score) - 1]
+        self.thresholds = y_score[last]
+        self.tps = np.cumsum(y_true)[last]
+        self.fps = last + 1 - self.tps
+        self.positives = int(self.tps[-1]) if len(last) else 0
+        self.negatives = len(y_score) - self.positives
+        self._ascending = -self.thresholds
+
+    def __len__(self):
+        return self.positives + self.negatives
+
+    def counts(self, threshold):
+        """(tp, fp) of predicting positive for scores >= threshold (scalar or array)."""
+        k = np.searchsorted(self._ascending, -np.asarray(threshold, dtype=np.float64), side='right')
+        tp = np.where(k > 0, self.tps[k - 1], 0)
+        fp = np.where(k > 0, self.fps[k - 1], 0)
+        return tp, fp
+
+    def at(self, threshold):
+        """Confusion matrix and metrics at `threshold`; arrays if it is one, numbers otherwise."""
+        tp, fp = self.counts(threshold)
+        fn, tn = self.positives - tp, self.negatives - fp
+        with np.errstate(invalid='ignore', divide='ignore'):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 1.0)
+            recall = tp / self.positives
+            metrics = {
+                'threshold': np.asarray(threshold, dtype=np.float64),
+                'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+                'precision': precision,
+                'recall': recall,
+                'fpr': fp / self.negatives,
+                'f1': np.where(tp > 0, 2 * precision * recall / (precision + recall), 0.0),
+                'accuracy': (tp + tn) / len(self),
+            }
+        if np.ndim(threshold) == 0:
+            return {k: v.item() for k, v in metrics.items()}
+        return metrics
+
+    def roc(self):
+        """(fpr, tpr) at every distinct score, starting at (0, 0)."""
+        return np.r_[0, self.fps] / self.negatives, np.r_[0, self.tps] / self.positives
+
+    def pr(self):
+        """(recall, precision) at every distinct score, starting at (0, 1)."""
+        return np.r_[0, self.tps] / self.positives, np.r_[1, self.tps / (self.tps + self.fps)]
+
+    def roc_auc(self):
+        fpr, tpr = self.roc()
+        return float(np.trapezoid(tpr, fpr))
+
+    def average_precision(self):
+        recall, precision = self.pr()
+        return float(np.sum(np.diff(recall) * precision[1:]))
+
+    def frame(self, max_points=MAX_CURVE_POINTS):
+        """Both curves with their thresholds, thinned to about `max_points` rows for plotting."""
+        fpr, tpr = self.roc()
+        recall, precision = self.pr()
+        df = pd.DataFrame({'threshold': np.r_[np.inf, self.thresholds], 'fpr': fpr, 'tpr': tpr,
+                           'recall': recall, 'precision': precision})
+        if len(df) > max_points:
+            df = df.iloc[np.unique(np.linspace(0, len(df) - 1, max_points).round().astype(int))]
+        return df
@@ -0,0 +1,134 @@
+"""Lag, rolling-window and RainToday-derived features of the weather store.
+
+All features look back at most HISTORY_DAYS calendar days, so the features of a day only depend
+on that location's observations of the HISTORY_DAYS days up to and including it. That is what
+makes the incremental updates in `weather_ingest` possible: appending new days only needs the
+last HISTORY_DAYS days of history, and the features of older days never change.
+
+The computation scatters each column into a dense (day x location) array, so every lag is a
+row shift and every rolling window a difference of cumulative sums, for all locations at once.
+The features live in their own dataset next to the store, partitioned the same way:
+
+    python -m ds_utils.weather_features             # (re)build from the store
+    df = weather_features.load(locations=['Sydney'], start='2023-01-01')
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils import weather_store
+
+# Paths
+FEATURES_PATH = 'data/australian_weather/features'
+
+# Settings
+LAGS = {
+    'Rainfall': [1, 2],
+    'Humidity3pm': [1],
+    'Pressure3pm': [1],
+    'Temp3pm': [1],
+    'WindGustSpeed': [1],
+}
+ROLLING_MEANS = {
+    'Rainfall': [3, 7],
+    'Humidity3pm': [3],
+    'Pressure3pm': [3],
+    'MaxTemp': [7],
+}
+RAIN_DAYS = [7, 30]                 # number of days with RainToday == 'Yes' in the last n days
+MAX_DAYS_SINCE_RAIN = 30            # DaysSinceRain is capped at this + 1
+
+HISTORY_DAYS = max(
+    [k + 1 for lags in LAGS.values() for k in lags]
+    + [k for windows in ROLLING_MEANS.values() for k in windows]
+    + RAIN_DAYS + [MAX_DAYS_SINCE_RAIN + 1]
+)
+FEATURES = (
+    [f'{col}_lag{k}' for col, lags in LAGS.items() for k in lags]
+    + [f'{col}_mean{k}' for col, windows in ROLLING_MEANS.items() for k in windows]
+    + [f'RainDays{k}' for k in RAIN_DAYS] + ['DaysSinceRain']
+)
+
+
+def _rolling_sum(dense, window):
+    """NaN-ignoring sum and count over the last `window` rows (days), including the current one."""
+    valid = ~np.isnan(dense)
+    sums = np.cumsum(np.where(valid, dense, 0), axis=0, dtype=np.float64)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] -= sums[:-window].copy()
+    counts[window:] -= counts[:-window].copy()
+    return sums, counts
+
+
+def compute(df, start=None):
+    """Features of the rows of `df` dated `start` or later (all rows if None).
+
+    `df` holds the store rows of one or more locations; for exact results it has to include
+    the HISTORY_DAYS days before `start`.
+    """
+    first = df['Date'].min()
+    days = (df['Date'] - first).dt.days.to_numpy()
+    location = pd.Categorical(df['Location'].astype(str))
+    loc = location.codes
+    shape = (days.max() + 1, len(location.categories))
+
+    def dense(values):
+        out = np.full(shape, np.nan)
+        out[days, loc] = values
+        return out
+
+    features = {}
+    for col, lags in LAGS.items():
+        values = dense(df[col].to_numpy(dtype=np.float64))
+        for k in lags:
+            lagged = np.full(shape, np.nan)
+            lagged[k:] = values[:-k]
+            features[f'{col}_lag{k}'] = lagged[days, loc]
+
+    for col, windows in ROLLING_MEANS.items():
+        values = dense(df[col].to_numpy(dtype=np.float64))
+        for k in windows:
+            sums, counts = _rolling_sum(values, k)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                features[f'{col}_mean{k}'] = (sums / counts)[days, loc]
+
+    rain_codes = df['RainToday'].cat.codes.to_numpy()
+    rain = dense(np.where(rain_codes < 0, np.nan, rain_codes))
+    for k in RAIN_DAYS:
+        sums, counts = _rolling_sum(rain, k)
+        features[f'RainDays{k}'] = np.where(counts > 0, sums, np.nan)[days, loc]
+
+    day = np.arange(shape[0])[:, None]
+    last_rain = np.maximum.accumulate(np.where(rain == 1, day, -shape[0] - MAX_DAYS_SINCE_RAIN), axis=0)
+    features['DaysSinceRain'] = np.minimum(day - last_rain, MAX_DAYS_SINCE_RAIN + 1)[days, loc]
+
+    out = pd.DataFrame({'Location': location, 'Date': df['Date'].to_numpy()})
+    for name in FEATURES:
+        out[name] = features[name].astype(np.float32)
+    if start is not None:
+        out = out[out['Date'] >= pd.Timestamp(start)]
+    return out.reset_index(drop=True)
+
+
+def build(store_path=weather_store.STORE_PATH, features_path=FEATURES_PATH):
+    """(Re)compute the features of the whole store."""
+    return weather_store.write_partitions(compute(weather_store.load(store_path=store_path)), features_path)
+
+
+def load(columns=None, locations=None, start=None, end=None, features_path=FEATURES_PATH):
+    return weather_store.load(columns, locations, start, end, store_path=features_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the lag/rolling features of the weather store.')
+    parser.add_argument('--store', default=weather_store.STORE_PATH)
+    parser.add_argument('--features', default=FEATURES_PATH)
+    args = parser.parse_args(argv)
+    n_rows = build(args.store, args.features)
+    print(f'wrote {len(FEATURES)} features of {n_rows:,} rows to {args.features}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Async fetch-and-parse pipeline for the daily weather observations.
+
+Replaces the selenium scraper: the observations are published as one plain CSV per station and
+month (the Bureau of Meteorology's "Daily Weather Observations"), so no browser is needed.
+Downloads run concurrently on asyncio, with
+    - an on-disk response cache, keyed by URL; months that are over never change, so they're
+      fetched exactly once, the current month is re-fetched at most every `max_age` seconds
+    - conditional re-fetches (If-None-Match / If-Modified-Since), a 304 reuses the cached body
+    - per-host throttling (at most one request every `min_interval` seconds per host) on top
+      of a global concurrency limit
+A station or month that fails (e.g. a 404) doesn't stop the others: it's listed in the
+frame's `attrs['failures']`, and only if every download fails is the first error raised.
+
+    stations = {'Sydney': '<station id>', ...}   # see load_stations()
+    df = weather_fetch.fetch_observations(stations, months=['2023-03'])
+    df.attrs['failures']                         # [{'location', 'month', 'url', 'error'}, ...]
+
+The station ids aren't part of the repository; put them in STATIONS_PATH as a JSON object
+mapping Location to id. `python -m scripts.weather_fixture_server --demo` runs the pipeline
+against a local stand-in server with fixture files instead of the real one.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+# Local imports
+from ds_utils import weather_store
+
+# Paths
+CACHE_PATH = 'data/australian_weather/cache/http'
+STATIONS_PATH = 'data/australian_weather/stations.json'
+
+# Settings
+URL_TEMPLATE = 'http://www.bom.gov.au/climate/dwo/{month:%Y%m}/text/{station}.{month:%Y%m}.csv'
+MAX_AGE = 3600                      # seconds before the current month is fetched again
+MIN_INTERVAL = 1.0                  # seconds between two requests to the same host
+CONCURRENCY = 4
+TIMEOUT = 30
+USER_AGENT = 'Data-Science-Projects weather fetcher'
+RAIN_THRESHOLD_MM = 1.0
+
+# Header prefixes of the observation CSVs and the store columns they map to
+HEADER_COLUMNS = {
+    'Date': 'Date',
+    'Minimum temperature': 'MinTemp',
+    'Maximum temperature': 'MaxTemp',
+    'Rainfall': 'Rainfall',
+    'Evaporation': 'Evaporation',
+    'Sunshine': 'Sunshine',
+    'Direction of maximum wind gust': 'WindGustDir',
+    'Speed of maximum wind gust': 'WindGustSpeed',
+    '9am Temperature': 'Temp9am',
+    '9am relative humidity': 'Humidity9am',
+    '9am cloud amount': 'Cloud9am',
+    '9am wind direction': 'WindDir9am',
+    '9am wind speed': 'WindSpeed9am',
+    '9am MSL pressure': 'Pressure9am',
+    '3pm Temperature': 'Temp3pm',
+    '3pm relative humidity': 'Humidity3pm',
+    '3pm cloud amount': 'Cloud3pm',
+    '3pm wind direction': 'WindDir3pm',
+    '3pm wind speed': 'WindSpeed3pm',
+    '3pm MSL pressure': 'Pressure3pm',
+}
+
+
+def load_stations(path=STATIONS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class ResponseCache:
+    """Response bodies on disk, plus the validators needed to re-fetch them conditionally."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+
+    def _files(self, url):
+        key = os.path.join(self.path, hashlib.sha1(url.encode()).hexdigest())
+        return key + '.body', key + '.json'
+
+    def get(self, url):
+        """(meta, body) of the cached response, or (None, None)."""
+        body_file, meta_file = self._files(url)
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+            with open(body_file, 'rb') as f:
+                return meta, f.read()
+        except FileNotFoundError:
+            return None, None
+
+    def put(self, url, body, etag=None, last_modified=None):
+        os.makedirs(self.path, exist_ok=True)
+        body_file, meta_file = self._files(url)
+        for file, data in [(body_file, body), (meta_file, json.dumps(
+                {'url': url, 'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()}).encode())]:
+            with open(file + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(file + '.tmp', file)
+
+    def touch(self, url):
+        meta, body = self.get(url)
+        self.put(url, body, meta['etag'], meta['last_modified'])
+
+
+class Fetcher:
+    """Cached, conditional, throttled HTTP GETs; the blocking requests run in worker threads."""
+
+    def __init__(self, cache_path=CACHE_PATH, max_age=MAX_AGE, min_interval=MIN_INTERVAL,
+                 concurrency=CONCURRENCY, timeout=TIMEOUT):
+        self.cache = ResponseCache(cache_path)
+        self.max_age = max_age
+        self.min_interval = min_interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._loop = None
+        self._semaphore = None
+        self._hosts = {}
+        self.stats = {'cached': 0, 'not_modified': 0, 'downloaded': 0, 'bytes': 0, 'failed': 0}
+
+    async def fetch(self, url, max_age=...):
+        """Body of `url`. `max_age=None` means a cached response never goes stale."""
+        max_age = self.max_age if max_age is ... else max_age
+        meta, body = self.cache.get(url)
+        if meta is not None and (max_age is None or time.time() - meta['fetched_at'] < max_age):
+            self.stats['cached'] += 1
+            return body
+
+        headers = {'User-Agent': USER_AGENT}
+        if meta is not None and meta['etag']:
+            headers['If-None-Match'] = meta['etag']
+        if meta is not None and meta['last_modified']:
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        # asyncio primitives are bound to the loop they're first used in
+        if self._loop is not asyncio.get_running_loop():
+            self._loop = asyncio.get_running_loop()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._hosts = {}
+        async with self._semaphore:
+            await self._throttle(urllib.parse.urlsplit(url).netloc)
+            status, new_body, response_headers = await asyncio.to_thread(self._get, url, headers)
+
+        if status == 304:
+            self.stats['not_modified'] += 1
+            self.cache.touch(url)
+            return body
+        self.stats['downloaded'] += 1
+        self.stats['bytes'] += len(new_body)
+        self.cache.put(url, new_body, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        return new_body
+
+    async def _throttle(self, host):
+        lock, last = self._hosts.setdefault(host, (asyncio.Lock(), [0.0]))
+        async with lock:
+            wait = last[0] + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last[0] = time.monotonic()
+
+    def _get(self, url, headers):
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, None, e.headers
+            raise
+
+
+def parse_observations(raw, location):
+    """One month of a station's observations as a frame with the store's columns and dtypes.
+
+    RainTomorrow and RISK_MM are left empty; they are only known once the next day is in.
+    """
+    text = raw.decode('cp1252') if isinstance(raw, bytes) else raw
+    lines = text.splitlines()
+    header = next(i for i, line in enumerate(lines) if '"Date"' in line or line.lstrip(',').startswith('Date,'))
+    df = pd.read_csv(io.StringIO('\n'.join(lines[header:])), skipinitialspace=True)
+
+    columns = {}
+    for col in df.columns:
+        for prefix, name in HEADER_COLUMNS.items():
+            if str(col).strip().startswith(prefix):
+                columns[col] = name
+                break
+    df = df[list(columns)].rename(columns=columns).dropna(subset=['Date'])
+    for col in ['WindGustSpeed', 'WindSpeed9am', 'WindSpeed3pm']:
+        df[col] = df[col].replace('Calm', 0)
+
+    df['Location'] = location
+    df = df.reindex(columns=weather_store.COLUMNS)
+    df[weather_store.MEASUREMENTS] = df[weather_store.MEASUREMENTS].apply(pd.to_numeric, errors='coerce')
+    df['RainToday'] = df['Rainfall'].gt(RAIN_THRESHOLD_MM).map({False: 'No', True: 'Yes'}).where(df['Rainfall'].notna())
+    return weather_store.to_frame(df.reset_index(drop=True))
+
+
+async def fetch_observations_async(stations, months, fetcher=None, url_template=URL_TEMPLATE, refresh=False):
+    fetcher = fetcher or Fetcher()
+    current = pd.Timestamp.today().to_period('M')
+    jobs = []
+    for month in pd.PeriodIndex(months, freq='M'):
+        # A month that's over won't change anymore, unless a refresh is forced
+        max_age = 0 if refresh else None if month < current else fetcher.max_age
+        for location, station in stations.items():
+            url = url_template.format(station=station, month=month.to_timestamp())
+            jobs.append((location, month, url, fetcher.fetch(url, max_age=max_age)))
+    bodies = await asyncio.gather(*(job for *_, job in jobs), return_exceptions=True)
+
+    frames, failures, errors = [], [], []
+    for (location, month, url, _), body in zip(jobs, bodies):
+        try:
+            if isinstance(body, BaseException):
+                raise body
+            frames.append(parse_observations(body, location))
+        except (OSError, ValueError, StopIteration) as e:   # HTTP and network errors, unparsable bodies
+            failures.append({'location': location, 'month': str(month), 'url': url, 'error': repr(e)})
+            errors.append(e)
+    fetcher.stats['failed'] += len(failures)
+    if not frames:
+        raise errors[0] if errors else ValueError('no stations or months to fetch')
+    df = pd.concat(frames, ignore_index=True)
+    df['Location'] = df['Location'].astype('category')
+    df = df.sort_values(['Location', 'Date'], ignore_index=True)
+    df.attrs['failures'] = failures
+    return df
+
+
+def fetch_observations(stations, months, fetcher=None, url_template=URL_TEMPLATE, refresh=False):
+    """Observations of all `stations` ({Location: station id}) for `months`, in one frame.
+
+    With `refresh=True` every cached response is revalidated with a conditional request. The
+    stations and months that failed are listed in `attrs['failures']`.
+    """
+    return asyncio.run(fetch_observations_async(stations, months, fetcher, url_template, refresh))
@@ -0,0 +1,180 @@
+"""Per-location, time-aware imputation of the weather measurements.
+
+Works on frames sorted by (Location, Date), as returned by `weather_store.load`. Every missing
+measurement is filled from the observed values of its own location, in this order:
+    1. time-weighted linear interpolation, for the first `interpolate_limit` rows of a gap
+       that has observations on both sides
+    2. forward fill, up to `ffill_limit` rows after the last observation
+    3. back fill, up to `bfill_limit` rows before the next observation
+    4. the location's median for that calendar month
+    5. the median of all locations for that calendar month
+Each step only ever looks at observed values, never at values imputed by an earlier step.
+Wind directions get steps 2 and 3, and a missing RainToday is derived from the imputed
+Rainfall. The targets (RainTomorrow, RISK_MM) are left alone.
+
+Instead of `groupby('Location').apply(...)`, the group boundaries of the sorted frame are used
+to find each row's previous/next observation with a single cumulative max/min over the whole
+column, so the cost doesn't grow with the number of locations. `impute_store` streams the
+store a few locations at a time, so the full table is never held in memory twice:
+
+    medians = weather_impute.month_medians()
+    for chunk in weather_impute.impute_store(medians=medians):
+        ...
+"""
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils import weather_store
+
+# Settings
+INTERPOLATE_LIMIT = 3
+FFILL_LIMIT = 2
+BFILL_LIMIT = 1
+LOCATIONS_PER_CHUNK = 8
+RAIN_THRESHOLD_MM = 1.0             # RainToday is 'Yes' if more than this fell
+
+MEASUREMENTS = [c for c in weather_store.MEASUREMENTS if c != 'RISK_MM']
+DIRECTIONS = ['WindGustDir', 'WindDir9am', 'WindDir3pm']
+
+
+def month_medians(store_path=weather_store.STORE_PATH, columns=MEASUREMENTS):
+    """Median of each column per calendar month over all locations, as a (12 x columns) frame.
+
+    Reads one column at a time, so this never loads more than two columns of the store.
+    """
+    dataset = weather_store.open_store(store_path)
+    medians = {}
+    for col in columns:
+        df = dataset.to_table(columns=['Date', col]).to_pandas()
+        medians[col] = df[col].groupby(df['Date'].dt.month).median()
+    return pd.DataFrame(medians).reindex(range(1, 13))
+
+
+class _Neighbours:
+    """Positions of the previous and next observed value within each row's location."""
+
+    def __init__(self, valid, group_start, group_end):
+        pos = np.arange(len(valid))
+        self.prev = np.maximum.accumulate(np.where(valid, pos, -1))
+        self.next = np.minimum.accumulate(np.where(valid, pos, len(valid))[::-1])[::-1]
+        self.missing = ~valid
+        self.has_prev = self.missing & (self.prev >= group_start)
+        self.has_next = self.missing & (self.next < group_end)
+        self.after_prev = pos - self.prev
+        self.before_next = self.next - pos
+
+    def ffill(self, limit):
+        return self.has_prev & (self.after_prev <= limit)
+
+    def bfill(self, limit):
+        return self.has_next & (self.before_next <= limit)
+
+    def interpolate(self, limit):
+        return self.has_prev & self.has_next & (self.after_prev <= limit)
+
+
+def _groups(codes):
+    """For every row of a frame sorted by group codes: start (incl.) and end (excl.) of its group."""
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    return np.repeat(starts, lengths), np.repeat(np.r_[starts[1:], n], lengths)
+
+
+def impute(df, medians=None, interpolate_limit=INTERPOLATE_LIMIT, ffill_limit=FFILL_LIMIT,
+           bfill_limit=BFILL_LIMIT):
+    """Impute a (Location, Date)-sorted frame in place and return it.
+
+    Without `medians` (see `month_medians`), step 5 falls back to the medians of the
+    frame itself, which is only representative if it holds all locations.
+    """
+    codes = pd.Categorical(df['Location']).codes
+    group_start, group_end = _groups(codes)
+    days = df['Date'].to_numpy('datetime64[D]').astype(np.int64)
+    month = df['Date'].dt.month.to_numpy()
+    if medians is None:
+        medians = df[MEASUREMENTS].groupby(month).median().reindex(range(1, 13))
+
+    for col in MEASUREMENTS:
+        values = df[col].to_numpy(dtype=np.float64)
+        n = _Neighbours(~np.isnan(values), group_start, group_end)
+        filled = values.copy()
+
+        mask = n.interpolate(interpolate_limit)
+        prev, following = n.prev[mask], n.next[mask]
+        weight = (days[mask] - days[prev]) / (days[following] - days[prev])
+        filled[mask] = values[prev] + weight * (values[following] - values[prev])
+
+        mask = n.ffill(ffill_limit) & np.isnan(filled)
+        filled[mask] = values[n.prev[mask]]
+        mask = n.bfill(bfill_limit) & np.isnan(filled)
+        filled[mask] = values[n.next[mask]]
+
+        mask = np.isnan(filled)
+        if mask.any():
+            location_medians = pd.Series(values).groupby([codes, month]).transform('median').to_numpy()
+            filled[mask] = location_medians[mask]
+            mask = np.isnan(filled)
+            filled[mask] = medians[col].to_numpy()[month[mask] - 1]
+        df[col] = filled.astype(df[col].dtype)
+
+    for col in DIRECTIONS:
+        values = df[col].cat.codes.to_numpy()
+        n = _Neighbours(values >= 0, group_start, group_end)
+        filled = values.copy()
+        mask = n.ffill(ffill_limit)
+        filled[mask] = values[n.prev[mask]]
+        mask = n.bfill(bfill_limit) & (filled < 0)
+        filled[mask] = values[n.next[mask]]
+        df[col] = pd.Categorical.from_codes(filled, dtype=df[col].dtype)
+
+    rain_today = df['RainToday'].cat.codes.to_numpy().copy()
+    mask = (rain_today < 0) & df['Rainfall'].notna().to_numpy()
+    rain_today[mask] = df['Rainfall'].to_numpy()[mask] > RAIN_THRESHOLD_MM
+    df['RainToday'] = pd.Categorical.from_codes(rain_today, dtype=df['RainToday'].dtype)
+    return df
+
+
+def impute_store(store_path=weather_store.STORE_PATH, medians=None, columns=None,
+                 locations_per_chunk=LOCATIONS_PER_CHUNK, **impute_kwargs):
+    """Yield the imputed store, `locations_per_chunk` locations at a time.
+
+    Locations are independent of each other, so a chunk of whole locations is imputed exactly
+    as it would be within the full table, given the same `medians`.
+    """
+    if medians is None:
+        medians = month_medians(store_path)
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + MEASUREMENTS + DIRECTIONS + ['RainToday']))
+    locations = weather_store.locations(store_path)
+    for i in range(0, len(locations), locations_per_chunk):
+        chunk = weather_store.load(columns, locations[i:i + locations_per_chunk], store_path=store_path)
+        yield impute(chunk, medians, **impute_kwargs)
+
+
+def naive_impute(df, medians, interpolate_limit=INTERPOLATE_LIMIT, ffill_limit=FFILL_LIMIT,
+                 bfill_limit=BFILL_LIMIT):
+    """Reference implementation of `impute` with `groupby().apply`, for tests and benchmarks."""
+    def impute_location(g):
+        g = g.set_index('Date')
+        month = g.index.month
+        for col in MEASUREMENTS:
+            s = g[col]
+            g[col] = (
+                s.fillna(s.interpolate(method='time', limit=interpolate_limit, limit_area='inside'))
+                .fillna(s.ffill(limit=ffill_limit))
+                .fillna(s.bfill(limit=bfill_limit))
+                .fillna(s.groupby(month).transform('median'))
+                .fillna(pd.Series(medians[col].to_numpy()[month - 1], index=g.index))
+                .astype(s.dtype)
+            )
+        for col in DIRECTIONS:
+            s = g[col]
+            g[col] = s.fillna(s.ffill(limit=ffill_limit)).fillna(s.bfill(limit=bfill_limit))
+        rain = g['Rainfall'].gt(RAIN_THRESHOLD_MM).map({False: 'No', True: 'Yes'}).where(g['Rainfall'].notna())
+        g['RainToday'] = g['RainToday'].fillna(rain.astype(g['RainToday'].dtype))
+        return g.reset_index()
+
+    out = df.groupby('Location', observed=True).apply(impute_location, include_groups=False)
+    return out.reset_index(level=0).reset_index(drop=True)[df.columns]
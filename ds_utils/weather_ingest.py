@@ -0,0 +1,110 @@
+"""Incremental daily ingestion into the weather store and its features.
+
+`ingest` takes new daily observations (any number of days and locations, e.g. from
+`weather_fetch`) and
+    1. derives RainToday from Rainfall where it's missing
+    2. upserts them into the store, keyed by (Location, Date)
+    3. completes the targets: appending day t sets RainTomorrow and RISK_MM of day t-1 to
+       RainToday and Rainfall of day t, and those of day t itself from day t+1 if that's
+       stored already (a re-ingested past day doesn't lose its targets)
+    4. recomputes the features of the new days from the last HISTORY_DAYS days of history
+Only the (Location, year) partitions that contain a new or completed row are read and
+rewritten, so a daily append costs O(new rows + one year per location), not O(whole store).
+
+    python -m ds_utils.weather_ingest observations.csv      # weatherAUS-formatted CSV
+    python -m ds_utils.weather_ingest --fetch 2023-03       # station ids from stations.json
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+# Local imports
+from ds_utils import weather_features, weather_store
+
+# Settings
+RAIN_THRESHOLD_MM = 1.0
+ONE_DAY = pd.Timedelta(days=1)
+
+
+def _merge(old, new):
+    """Rows of `old` and `new`, with `new` winning on duplicate (Location, Date)."""
+    df = pd.concat([old.astype({'Location': str}), new]) if len(old) else new.copy()
+    return df.drop_duplicates(['Location', 'Date'], keep='last').sort_values(['Location', 'Date'], ignore_index=True)
+
+
+def _partitions(df):
+    return pd.MultiIndex.from_arrays([df['Location'].astype(str), df['Date'].dt.year])
+
+
+def _keys(df):
+    return pd.MultiIndex.from_arrays([df['Location'].astype(str), df['Date']])
+
+
+def ingest(observations, store_path=weather_store.STORE_PATH, features_path=weather_features.FEATURES_PATH):
+    """Append/replace daily observations in the store and update the features; returns a summary."""
+    new = weather_store.to_frame(observations.reindex(columns=weather_store.COLUMNS).copy())
+    new['Location'] = new['Location'].astype(str)
+    rain_today = new['Rainfall'].gt(RAIN_THRESHOLD_MM).map({False: 'No', True: 'Yes'}).where(new['Rainfall'].notna())
+    new['RainToday'] = new['RainToday'].fillna(rain_today.astype(new['RainToday'].dtype))
+    locations = sorted(new['Location'].unique())
+    first = new['Date'].min()
+    history_start = first - pd.Timedelta(days=weather_features.HISTORY_DAYS)
+
+    # The store: the new rows, plus the targets of the day before each of them
+    old = weather_store.load(locations=locations, start=history_start.replace(month=1, day=1), store_path=store_path) \
+        if weather_store.store_exists(store_path) else new.iloc[:0]
+    df = _merge(old, new)
+    keys, new_keys = _keys(df), _keys(new)
+    next_keys = pd.MultiIndex.from_arrays([df['Location'], df['Date'] + ONE_DAY])
+    completed = next_keys.isin(new_keys) | (keys.isin(new_keys) & next_keys.isin(keys))
+    next_rows = keys.get_indexer(next_keys[completed])
+    df.loc[completed, 'RainTomorrow'] = df['RainToday'].to_numpy()[next_rows]
+    df.loc[completed, 'RISK_MM'] = df['Rainfall'].to_numpy()[next_rows]
+
+    partitions = _partitions(df)
+    rewrite = partitions.isin(partitions[completed | keys.isin(new_keys)])
+    weather_store.write_partitions(df[rewrite], store_path)
+
+    # The features: every day from the first new one on, computed from HISTORY_DAYS days of history
+    if not weather_store.store_exists(features_path):
+        weather_features.build(store_path, features_path)
+        n_features = len(df)
+    else:
+        features = weather_features.compute(df[df['Date'] >= history_start], start=first)
+        old = weather_features.load(locations=locations, start=first.replace(month=1, day=1), features_path=features_path)
+        merged = _merge(old, features)
+        weather_store.write_partitions(merged[_partitions(merged).isin(_partitions(features))], features_path)
+        n_features = len(features)
+
+    return {
+        'new_rows': len(new),
+        'completed_targets': int(completed.sum()),
+        'store_rows_rewritten': int(rewrite.sum()),
+        'feature_rows_updated': n_features,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append daily observations to the weather store.')
+    parser.add_argument('csv_path', nargs='?', help='observations in the weatherAUS CSV format')
+    parser.add_argument('--fetch', metavar='MONTH', help='fetch this month (YYYY-MM) for all stations instead')
+    parser.add_argument('--store', default=weather_store.STORE_PATH)
+    parser.add_argument('--features', default=weather_features.FEATURES_PATH)
+    args = parser.parse_args(argv)
+
+    if args.fetch:
+        from ds_utils import weather_fetch
+        observations = weather_fetch.fetch_observations(weather_fetch.load_stations(), [args.fetch])
+        for failure in observations.attrs['failures']:
+            print(f'failed: {failure["location"]} {failure["month"]}: {failure["error"]}', file=sys.stderr)
+    elif args.csv_path:
+        observations = pd.read_csv(args.csv_path)
+    else:
+        parser.error('pass a CSV path or --fetch MONTH')
+    for key, value in ingest(observations, args.store, args.features).items():
+        print(f'{key:<22} {value:,}')
+
+
+if __name__ == '__main__':
+    main()
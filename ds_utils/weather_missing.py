@@ -0,0 +1,131 @@
+"""Missing-value analytics for the weather store.
+
+Every row of the store is reduced to a uint32 null bitmask (bit j set <=> column j is missing).
+The bitmasks are aggregated once, in a single vectorized pass over the (Location, Date)-sorted
+rows, into a (location x month x column) count matrix that is cached on disk next to the store.
+Any location/month-range query is then just a slice-and-sum over that small matrix:
+
+    matrix = weather_missing.load_matrix()
+    summary = matrix.summary(locations=['Sydney', 'Perth'], start='2015-01', end='2019-12')
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+# Local imports
+from ds_utils import weather_store
+
+# Paths
+MATRIX_PATH = 'data/australian_weather/missing_matrix.npz'
+
+# Every column except the keys can be missing
+COLUMNS = [c for c in weather_store.COLUMNS if c not in ('Date', 'Location')]
+
+
+def null_bitmask(table, columns=COLUMNS):
+    """One uint32 per row of a pyarrow table, with bit j set if `columns[j]` is null."""
+    bits = np.zeros(table.num_rows, dtype=np.uint32)
+    for j, col in enumerate(columns):
+        is_null = pc.is_null(table[col], nan_is_null=True).to_numpy()
+        bits |= is_null.astype(np.uint32) << np.uint32(j)
+    return bits
+
+
+class MissingMatrix:
+    """Missing-value counts per (location, month, column), plus row and incomplete-row counts."""
+
+    def __init__(self, locations, months, missing, rows, incomplete, columns=COLUMNS):
+        self.locations = list(locations)
+        self.months = pd.PeriodIndex(months, freq='M')
+        self.columns = list(columns)
+        self.missing = missing          # (L, M, C)
+        self.rows = rows                # (L, M)
+        self.incomplete = incomplete    # (L, M)
+
+    @classmethod
+    def from_store(cls, store_path=weather_store.STORE_PATH):
+        table = weather_store.open_store(store_path).to_table(columns=['Location', 'Date'] + COLUMNS)
+        keys = table.select(['Location', 'Date']).to_pandas()
+        order = np.lexsort((keys['Date'].to_numpy(), keys['Location'].to_numpy()))
+        bits = null_bitmask(table)[order]
+        keys = keys.iloc[order]
+
+        locations, loc_idx = np.unique(keys['Location'].to_numpy(), return_inverse=True)
+        dates = keys['Date'].dt
+        month = (dates.year * 12 + dates.month - 1).to_numpy()
+        month_idx = month - month.min()
+        months = pd.period_range(keys['Date'].min(), keys['Date'].max(), freq='M')
+
+        # Rows are sorted by (location, month), so every cell is one contiguous run
+        cell = loc_idx * len(months) + month_idx
+        starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+        cells = cell[starts]
+        n_cells = len(locations) * len(months)
+
+        rows = np.zeros(n_cells, dtype=np.int64)
+        rows[cells] = np.diff(np.r_[starts, len(cell)])
+        incomplete = np.zeros(n_cells, dtype=np.int64)
+        incomplete[cells] = np.add.reduceat((bits != 0).astype(np.int64), starts)
+        missing = np.zeros((n_cells, len(COLUMNS)), dtype=np.int64)
+        for j in range(len(COLUMNS)):
+            column_bits = ((bits >> np.uint32(j)) & 1).astype(np.int64)
+            missing[cells, j] = np.add.reduceat(column_bits, starts)
+
+        shape = (len(locations), len(months))
+        return cls(locations, months, missing.reshape(shape + (-1,)), rows.reshape(shape), incomplete.reshape(shape))
+
+    def save(self, path, version):
+        np.savez_compressed(
+            path, version=version, locations=np.array(self.locations), months=np.array(self.months.astype(str), dtype=str),
+            columns=np.array(self.columns), missing=self.missing, rows=self.rows, incomplete=self.incomplete,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return str(f['version']), cls(
+                f['locations'], f['months'], f['missing'], f['rows'], f['incomplete'], list(f['columns']),
+            )
+
+    def _select(self, locations=None, start=None, end=None):
+        loc = slice(None) if locations is None else [self.locations.index(l) for l in locations]
+        first = 0 if start is None else max(0, (pd.Period(start, freq='M') - self.months[0]).n)
+        last = len(self.months) if end is None else max(0, (pd.Period(end, freq='M') - self.months[0]).n + 1)
+        return loc, slice(first, last)
+
+    def summary(self, locations=None, start=None, end=None):
+        """Totals for the selected locations and (inclusive) month range."""
+        loc, months = self._select(locations, start, end)
+        rows = int(self.rows[loc, months].sum())
+        missing = self.missing[loc, months].sum(axis=(0, 1))
+        incomplete = int(self.incomplete[loc, months].sum())
+        return {
+            'rows': rows,
+            'missing_values': int(missing.sum()),
+            'missing_values_pct': 100 * missing.sum() / max(rows * len(self.columns), 1),
+            'incomplete_rows': incomplete,
+            'incomplete_rows_pct': 100 * incomplete / max(rows, 1),
+            'by_column_pct': pd.Series(100 * missing / max(rows, 1), index=self.columns),
+        }
+
+    def by_location(self, locations=None, start=None, end=None):
+        """Percentage of missing values per location (rows) and column (columns)."""
+        loc, months = self._select(locations, start, end)
+        missing = self.missing[loc, months].sum(axis=1)
+        rows = self.rows[loc, months].sum(axis=1)
+        index = self.locations if locations is None else list(locations)
+        return pd.DataFrame(100 * missing / np.maximum(rows, 1)[:, None], index=index, columns=self.columns)
+
+
+def load_matrix(store_path=weather_store.STORE_PATH, matrix_path=MATRIX_PATH):
+    """The cached matrix for the store's current version, rebuilt if the store changed."""
+    version = weather_store.store_version(store_path)
+    if os.path.exists(matrix_path):
+        cached_version, matrix = MissingMatrix.load(matrix_path)
+        if cached_version == version:
+            return matrix
+    matrix = MissingMatrix.from_store(store_path)
+    matrix.save(matrix_path, version)
+    return matrix
@@ -0,0 +1,113 @@
+"""RainTomorrow probabilities for all locations at once.
+
+One gradient boosting model covers all locations (Location is one of its categorical features),
+so predicting for every location is a single `predict_proba` call on a 49-row matrix, built in
+one vectorized step from the latest store row and features of every location:
+
+    probabilities = weather_predict.predict()            # latest date in the store
+    probabilities = weather_predict.predict('2023-03-01')
+
+Train it (on the store and the features built by weather_features) with:
+    python -m ds_utils.weather_predict --train
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+# Local imports
+from ds_utils import weather_features, weather_store
+from ds_utils.model_registry import open_registry
+
+# Settings
+MODEL_NAME = 'rain_tomorrow'
+LOOKBACK_DAYS = 7                   # a location's latest row may be this many days older than the date asked for
+CATEGORICAL = ['Location', 'WindGustDir', 'WindDir9am', 'WindDir3pm', 'RainToday']
+NUMERICAL = [c for c in weather_store.MEASUREMENTS if c != 'RISK_MM'] + weather_features.FEATURES
+FEATURES = CATEGORICAL + NUMERICAL
+
+
+def load_rows(start=None, end=None, locations=None, store_path=weather_store.STORE_PATH,
+              features_path=weather_features.FEATURES_PATH):
+    """Store rows joined with their features, sorted by (Location, Date)."""
+    df = weather_store.load(locations=locations, start=start, end=end, store_path=store_path)
+    features = weather_features.load(weather_features.FEATURES, locations, start, end, features_path)
+    return df.merge(features, on=['Location', 'Date'], how='left')
+
+
+def feature_matrix(df, locations):
+    """float32 matrix of FEATURES; categorical columns as codes (-1, i.e. NaN, if missing/unknown)."""
+    X = np.empty((len(df), len(FEATURES)), dtype=np.float32)
+    X[:, 0] = pd.Categorical(df['Location'].astype(str), categories=locations).codes
+    for j, col in enumerate(CATEGORICAL[1:], 1):
+        X[:, j] = df[col].cat.codes
+    X[:, :len(CATEGORICAL)][X[:, :len(CATEGORICAL)] < 0] = np.nan
+    X[:, len(CATEGORICAL):] = df[NUMERICAL].to_numpy(dtype=np.float32)
+    return X
+
+
+def train(store_path=weather_store.STORE_PATH, features_path=weather_features.FEATURES_PATH, registry=None,
+          **params):
+    df = load_rows(store_path=store_path, features_path=features_path)
+    df = df[df['RainTomorrow'].notna()]
+    locations = sorted(df['Location'].astype(str).unique())
+    model = HistGradientBoostingClassifier(
+        categorical_features=[True] * len(CATEGORICAL) + [False] * len(NUMERICAL), random_state=0, **params,
+    )
+    model.fit(feature_matrix(df, locations), (df['RainTomorrow'] == 'Yes').to_numpy())
+    registry = registry or open_registry()
+    registry.save(MODEL_NAME, {'model': model, 'locations': locations, 'features': FEATURES})
+    return model
+
+
+def model_available(registry=None):
+    return MODEL_NAME in (registry or open_registry())
+
+
+def model_version(registry=None):
+    return (registry or open_registry()).version(MODEL_NAME)
+
+
+def latest_rows(date=None, store_path=weather_store.STORE_PATH, features_path=weather_features.FEATURES_PATH):
+    """The latest row of every location on or before `date` (default: the store's last date)."""
+    end = pd.Timestamp(date) if date is not None else weather_store.last_date(store_path)
+    df = load_rows(end - pd.Timedelta(days=LOOKBACK_DAYS), end, store_path=store_path, features_path=features_path)
+    return df.drop_duplicates('Location', keep='last').reset_index(drop=True)
+
+
+def predict(date=None, registry=None, store_path=weather_store.STORE_PATH,
+            features_path=weather_features.FEATURES_PATH):
+    """Probability of rain tomorrow per location, from a single batched model call; empty if no
+    location has a row within LOOKBACK_DAYS of `date`."""
+    bundle = (registry or open_registry()).get(MODEL_NAME)
+    rows = latest_rows(date, store_path, features_path)
+    probability = bundle['model'].predict_proba(feature_matrix(rows, bundle['locations']))[:, 1] \
+        if len(rows) else []
+    return pd.DataFrame({
+        'Location': rows['Location'].astype(str),
+        'Date': rows['Date'],
+        'RainToday': rows['RainToday'],
+        'RainTomorrow probability': probability,
+    }).sort_values('RainTomorrow probability', ascending=False, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the RainTomorrow model or predict with it.')
+    parser.add_argument('--train', action='store_true')
+    parser.add_argument('--date', help='predict for the day after this date (default: latest in the store)')
+    args = parser.parse_args(argv)
+
+    if args.train:
+        start = time.perf_counter()
+        train()
+        print(f'trained {MODEL_NAME} in {time.perf_counter() - start:.1f}s')
+    start = time.perf_counter()
+    probabilities = predict(args.date)
+    print(probabilities.to_string())
+    print(f'{len(probabilities)} locations predicted in {1000 * (time.perf_counter() - start):.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Columnar store of the full weatherAUS dataset.
+
+The CSV (226,868 rows x 24 columns, ~50 MB) is converted once into a Parquet dataset that is
+hive-partitioned by Location and year, with the wind directions and Yes/No columns stored as
+dictionary-encoded categoricals and all measurements as float32. Reading goes through a
+memory-mapped pyarrow dataset, so a query only touches the partitions and columns it needs:
+
+    df = weather_store.load(columns=['Date', 'Rainfall'], locations=['Sydney'], start='2020-01-01')
+
+Build the store with:
+    python -m ds_utils.weather_store path/to/weatherAUS.csv
+"""
+import argparse
+import functools
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+
+# Paths
+STORE_PATH = 'data/australian_weather/store'
+
+# Schema
+COMPASS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+YES_NO = ['No', 'Yes']
+CATEGORIES = {
+    'WindGustDir': COMPASS,
+    'WindDir9am': COMPASS,
+    'WindDir3pm': COMPASS,
+    'RainToday': YES_NO,
+    'RainTomorrow': YES_NO,
+}
+MEASUREMENTS = [
+    'MinTemp', 'MaxTemp', 'Rainfall', 'Evaporation', 'Sunshine', 'WindGustSpeed', 'WindSpeed9am', 'WindSpeed3pm',
+    'Humidity9am', 'Humidity3pm', 'Pressure9am', 'Pressure3pm', 'Cloud9am', 'Cloud3pm', 'Temp9am', 'Temp3pm', 'RISK_MM',
+]
+COLUMNS = ['Date', 'Location'] + MEASUREMENTS[:5] + ['WindGustDir', 'WindGustSpeed', 'WindDir9am', 'WindDir3pm'] \
+    + MEASUREMENTS[6:16] + ['RainToday', 'RISK_MM', 'RainTomorrow']
+PARTITIONING = ds.partitioning(pa.schema([('Location', pa.string()), ('year', pa.int16())]), flavor='hive')
+
+
+def to_frame(df):
+    """Cast a raw weatherAUS frame to the store's dtypes (in place where possible)."""
+    df['Date'] = pd.to_datetime(df['Date'])
+    for col, categories in CATEGORIES.items():
+        df[col] = pd.Categorical(df[col], categories=categories)
+    df[MEASUREMENTS] = df[MEASUREMENTS].astype('float32')
+    return df
+
+
+def write_partitions(df, path=STORE_PATH):
+    """Write `df` to a (Location, year)-partitioned dataset, replacing only the partitions it covers."""
+    df = df.assign(Location=df['Location'].astype(str), year=df['Date'].dt.year.astype('int16'))
+    df = df.sort_values(['Location', 'Date'], ignore_index=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table, path, format='parquet', partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+    )
+    _open_store.cache_clear()
+    return len(df)
+
+
+def build_store(csv_path, store_path=STORE_PATH):
+    return write_partitions(to_frame(pd.read_csv(csv_path)), store_path)
+
+
+def store_exists(store_path=STORE_PATH):
+    return os.path.isdir(store_path) and any(os.scandir(store_path))
+
+
+@functools.lru_cache(maxsize=8)
+def _open_store(store_path, version):
+    return ds.dataset(
+        store_path, format='parquet', partitioning=PARTITIONING,
+        filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def open_store(store_path=STORE_PATH):
+    """The memory-mapped pyarrow dataset, rediscovered only when the store's files change (e.g.
+    partitions written by an ingestion in another process)."""
+    return _open_store(store_path, store_version(store_path))
+
+
+def store_version(store_path=STORE_PATH):
+    """Hash over the store's file names, sizes and mtimes, for use as a cache key."""
+    h = hashlib.sha1()
+    for root, _, files in sorted(os.walk(store_path)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            h.update(f'{root}/{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return h.hexdigest()
+
+
+def make_filter(locations=None, start=None, end=None):
+    """Pushdown predicate; year bounds let pyarrow skip whole partitions before reading any file."""
+    conditions = []
+    if locations is not None:
+        conditions.append(ds.field('Location').isin(list(locations)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions += [ds.field('year') >= start.year, ds.field('Date') >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions += [ds.field('year') <= end.year, ds.field('Date') <= end]
+    return functools.reduce(lambda a, b: a & b, conditions) if conditions else None
+
+
+def load(columns=None, locations=None, start=None, end=None, store_path=STORE_PATH):
+    """Read a projection/selection of the store into a DataFrame sorted by Location and Date.
+
+    Works for any dataset written by `write_partitions`, e.g. the derived features.
+    """
+    dataset = open_store(store_path)
+    if columns is not None:
+        columns = list(dict.fromkeys(['Location', 'Date'] + list(columns)))
+    table = dataset.to_table(columns=columns, filter=make_filter(locations, start, end))
+    if columns is None:
+        names = [name for name in table.column_names if name != 'year']
+        columns = sorted(names, key=lambda c: COLUMNS.index(c) if c in COLUMNS else len(COLUMNS))
+    df = table.to_pandas()[columns]
+    df['Location'] = df['Location'].astype('category')
+    return df.sort_values(['Location', 'Date'], ignore_index=True)
+
+
+def locations(store_path=STORE_PATH):
+    return sorted(entry.name.split('=', 1)[1] for entry in os.scandir(store_path) if entry.name.startswith('Location='))
+
+
+def date_range(store_path=STORE_PATH):
+    dates = open_store(store_path).to_table(columns=['Date'])['Date']
+    return pd.Timestamp(pc.min(dates).as_py()), pd.Timestamp(pc.max(dates).as_py())
+
+
+def last_date(store_path=STORE_PATH):
+    """The latest Date in the store, read from the partitions of the latest year only."""
+    years = [
+        int(entry.name.split('=', 1)[1])
+        for location in os.scandir(store_path) if location.name.startswith('Location=')
+        for entry in os.scandir(location.path) if entry.name.startswith('year=')
+    ]
+    dates = open_store(store_path).to_table(columns=['Date'], filter=ds.field('year') == max(years))['Date']
+    return pd.Timestamp(pc.max(dates).as_py())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the columnar weatherAUS store from the CSV.')
+    parser.add_argument('csv_path')
+    parser.add_argument('--store', default=STORE_PATH)
+    args = parser.parse_args(argv)
+    n_rows = build_store(args.csv_path, args.store)
+    print(f'wrote {n_rows:,} rows to {args.store}')
+
+
+if __name__ == '__main__':
+    main()
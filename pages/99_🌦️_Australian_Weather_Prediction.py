@@ -1,186 +1,261 @@
 # Third party imports
 import streamlit as st
-import pandas as pd
+import altair as alt
 
 # Local imports
 import st_utils
+from ds_utils import streaming_corr, weather_missing, weather_predict, weather_store
 
 # Paths
 DATA_PATH = 'data/australian_weather/'
 TITLE_IMG_PATH = 'data/australian_weather/australia.png'
 
+# Settings
+MAX_DISPLAY_ROWS = 10_000
+STORE_VERSION_TTL = 60              # seconds a change to the store may go unnoticed
 
-st.set_page_config(page_title="Australian-Weather-Prediction", page_icon="🌦️", layout="wide")
-st.markdown(f'<style>{open("style.css").read()}</style>', unsafe_allow_html=True)
-    
 
-# Table of Contents
-st.sidebar.markdown("""
-    # Contents
-    1. [Introduction](#intro)
-    2. [Exploratory Data Analysis](#eda)
-    3. [Handling Missing Data](#handling-missing-data)
-    4. [Feature Engineering](#feature-engineering)
-    5. [Scaling](#scaling)
-    6. [Modeling](#modeling)
-    7. [Evaluation & Insights](#evaluation)
-    8. [Final Thoughts](#final-thoughts)
-""")
+st.set_page_config(page_title="Australian-Weather-Prediction", page_icon="🌦️", layout="wide")
+st.markdown(f'<style>{st_utils.load_css()}</style>', unsafe_allow_html=True)
 
-st.sidebar.divider()
 
+st.title('Australian Weather Prediction')
+st.caption('[DataScientest](https://datascientest.com/) Bootcamp Portfolio Project')
 
-st_utils.get_sidebar_links()
+st_utils.image(TITLE_IMG_PATH, caption='Image created with DALL·E')
 
 
-st.title('Australian Weather Prediction')
-st.caption('[DataScientest](https://datascientest.com/) Bootcamp Portfolio Project')
+@st.cache_data(ttl=STORE_VERSION_TTL)
+def store_version():
+    # Hashing the store stats all of its files, too many to do on every rerun
+    return weather_store.store_version()
 
-st.image(TITLE_IMG_PATH, caption='Image created with DALL·E')
 
-st.markdown('<a name="intro"></a>', unsafe_allow_html=True)
-st.write('## Introduction')
-
-st.write('''
-    This project was done in the context of data science bootcamp at [*DataScientest*](https://datascientest.com/). 
-    The objective was to use machine learning in order to predict the weather at 49 different locations in Australia.
-         
-         
-         ''')
+@st.cache_data
+def store_overview(version):
+    start, end = weather_store.date_range()
+    return weather_store.locations(), start.date(), end.date()
+
+
+@st.cache_data(max_entries=64)
+def query_store(version, locations, start, end):
+    return weather_store.load(locations=locations, start=start, end=end)
 
-st.write('''
-    Originally I uploaded an interactive docker containerized version of this project ([link](https://australia-weather-prediction.onrender.com/))
-    which unfortunately takes up to a minute to load, due to the fact that it has dynamic
-    web scraping capabilities using selenium, which is dependent on its own browser and driver. 
-    The Chrome browser and the many pre-trained machine learning models take up a lot of space, 
-    making the app extremely slow to reboot. 
-    Once it's up, however, it works pretty fast. I'm currently revisiting this project to improve both its presentation
-    and its performance. Alas, it's not there yet.
-''')
-# st.write('''
-#          This project was done in the context of 
-#          This project relies on real word data gathered from 49 different weather stations spread across Australia. 
-#          There is version of [this dataset on Kaggle](https://www.kaggle.com/datasets/arunavakrchakraborty/australia-weather-data) but I found
-#          The target variable *RainTomorrow* is binary
 
-#         ''')
+def explore_store():
+    version = store_version()
+    locations, first_day, last_day = store_overview(version)
+    col1, col2 = st.columns(2)
+    selected = col1.multiselect('Locations', locations, default=locations[:1])
+    start, end = col2.slider('Date range', min_value=first_day, max_value=last_day, value=(first_day, last_day))
+    df = query_store(version, tuple(selected), start, end)
+    st.caption(f'{len(df):,} rows' + (f' (showing the first {MAX_DISPLAY_ROWS:,})' if len(df) > MAX_DISPLAY_ROWS else ''))
+    st.dataframe(df.head(MAX_DISPLAY_ROWS))
 
-#  dataset [hi](https://rdrr.io/cran/rattle.data/man/weatherAUS.html)
-         
-#          2007-11-01   2023-03-25
-# https://docs.google.com/document/d/1jpf_bB-TFMacsucUzkPHaMWB2LF22GWylV_m6j6GyCg/edit
 
-st.divider()
+@st.cache_resource
+def missing_matrix(version):
+    return weather_missing.load_matrix()
 
-st.markdown('<a name="eda"></a>', unsafe_allow_html=True)
-st.write('## Exploratory Data Analysis')
-st.write('A first look at the dataset:')
 
-st.dataframe(pd.read_csv(DATA_PATH + 'head.csv'))
-st.write('''
-    - Each corresponds to a day's measurement at a given location in Australia
-    - 226,868 rows and 24 columns
-    - No duplicate rows 
-    - Total missing values: 644,978 (11.85 %)
-    - Rows with missing values: 140,583  (61.97 %)
-    - The column *RainTomorrow* represents the binary target
-    - The column *RISK_MM* was generated by the weather stations own prediction algorithms. Since I want to rely on raw data only I won't use it.
-    - That leaves 22 features
-    - Feature groups:
-        - **Wind**: *WindGustDir*, *WindDir9am*, *WindDir3pm*, *WindGustSpeed*, *WindSpeed9am*, *WindSpeed3pm* *(speed in km/h)*
-        - **Temperature**: *MinTemp*, *MaxTemp*, *Temp9am*, *Temp3pm* *(°C)*
-        - **Humidity**: *Humidity9am*, *Humidity3pm* *(%)*
-        - **Cloud**: *Cloud9am*, *Cloud3pm* *(number of eighths of sky)*
-        - **Pressure**: *Pressure9am*, *Pressure3pm* *(hpa)*
-    - Singular features:
-        - *Date*
-        - *Location*
-        - *Rainfall (mm)*
-        - *Evaporation (mm)*
-        - *Sunshine (hours of bright sunshine)*
-        - *RainToday ("Yes" if >1mm of rain)*
+@st.cache_resource
+def correlations(version):
+    return streaming_corr.load_weather()
+
+
+def explore_missing():
+    matrix = missing_matrix(store_version())
+    col1, col2 = st.columns(2)
+    locations = col1.multiselect('Locations', matrix.locations, placeholder='All locations') or None
+    months = [str(m) for m in matrix.months]
+    start, end = col2.select_slider('Months', options=months, value=(months[0], months[-1]))
+
+    summary = matrix.summary(locations, start, end)
+    col1, col2 = st.columns(2)
+    col1.metric('Total missing values', f"{summary['missing_values']:,} ({summary['missing_values_pct']:.2f} %)")
+    col2.metric('Rows with missing values', f"{summary['incomplete_rows']:,} ({summary['incomplete_rows_pct']:.2f} %)")
+    st.bar_chart(summary['by_column_pct'].rename('missing (%)'))
+
+    by_location = matrix.by_location(locations, start, end)
+    heatmap = by_location.rename_axis('Location').reset_index().melt('Location', var_name='Column', value_name='missing (%)')
+    st.altair_chart(
+        alt.Chart(heatmap).mark_rect().encode(
+            x=alt.X('Column:N', sort=matrix.columns),
+            y='Location:N',
+            color=alt.Color('missing (%):Q', scale=alt.Scale(scheme='oranges', domain=[0, 100])),
+            tooltip=['Location', 'Column', alt.Tooltip('missing (%):Q', format='.1f')],
+        ),
+        width='stretch',
+    )
+
+
+@st.cache_data(max_entries=32)
+def rain_tomorrow(version, model_version, date):
+    return weather_predict.predict(date)
+
+
+def show_rain_tomorrow():
+    version = store_version()
+    _, first_day, last_day = store_overview(version)
+    date = st.date_input('Weather observed on', value=last_day, min_value=first_day, max_value=last_day)
+    probabilities = rain_tomorrow(version, weather_predict.model_version(), date)
+    if probabilities.empty:
+        st.info(f'No observations within {weather_predict.LOOKBACK_DAYS} days before {date}.')
+        return
+    st.caption(f'Probability of rain on the following day at {len(probabilities)} locations, predicted in a single batch')
+    st.dataframe(
+        probabilities,
+        column_config={
+            'Date': st.column_config.DateColumn('Latest observation'),
+            'RainTomorrow probability': st.column_config.ProgressColumn(min_value=0, max_value=1, format='percent'),
+        },
+        hide_index=True,
+    )
+
+
+sections = st_utils.Sections()
+
+
+@sections.section('intro', 'Introduction')
+def intro():
+    st.write('''
+        This project was done in the context of data science bootcamp at [*DataScientest*](https://datascientest.com/). 
+        The objective was to use machine learning in order to predict the weather at 49 different locations in Australia.
+
+
+             ''')
+
+    st.write('''
+        Originally I uploaded an interactive docker containerized version of this project ([link](https://australia-weather-prediction.onrender.com/))
+        which unfortunately takes up to a minute to load, due to the fact that it has dynamic
+        web scraping capabilities using selenium, which is dependent on its own browser and driver. 
+        The Chrome browser and the many pre-trained machine learning models take up a lot of space, 
+        making the app extremely slow to reboot. 
+        Once it's up, however, it works pretty fast. I'm currently revisiting this project to improve both its presentation
+        and its performance. Alas, it's not there yet.
+    ''')
+    # st.write('''
+    #          This project was done in the context of 
+    #          This project relies on real word data gathered from 49 different weather stations spread across Australia. 
+    #          There is version of [this dataset on Kaggle](https://www.kaggle.com/datasets/arunavakrchakraborty/australia-weather-data) but I found
+    #          The target variable *RainTomorrow* is binary
+
+    #         ''')
+
+    #  dataset [hi](https://rdrr.io/cran/rattle.data/man/weatherAUS.html)
+
+    #          2007-11-01   2023-03-25
+    # https://docs.google.com/document/d/1jpf_bB-TFMacsucUzkPHaMWB2LF22GWylV_m6j6GyCg/edit
 
-''')
 
-st_utils.minor_div()
+@sections.section('eda', 'Exploratory Data Analysis', lazy=True)
+def eda():
+    st.write('A first look at the dataset:')
 
-# st.write('')
-# st.dataframe(pd.read_csv(DATA_PATH + 'cols_info.csv'))
+    if weather_store.store_exists():
+        explore_store()
+    else:
+        st.dataframe(st_utils.load_csv(DATA_PATH + 'head.csv'))
+    st.write('''
+        - Each corresponds to a day's measurement at a given location in Australia
+        - 226,868 rows and 24 columns
+        - No duplicate rows 
+        - Total missing values: 644,978 (11.85 %)
+        - Rows with missing values: 140,583  (61.97 %)
+        - The column *RainTomorrow* represents the binary target
+        - The column *RISK_MM* was generated by the weather stations own prediction algorithms. Since I want to rely on raw data only I won't use it.
+        - That leaves 22 features
+        - Feature groups:
+            - **Wind**: *WindGustDir*, *WindDir9am*, *WindDir3pm*, *WindGustSpeed*, *WindSpeed9am*, *WindSpeed3pm* *(speed in km/h)*
+            - **Temperature**: *MinTemp*, *MaxTemp*, *Temp9am*, *Temp3pm* *(°C)*
+            - **Humidity**: *Humidity9am*, *Humidity3pm* *(%)*
+            - **Cloud**: *Cloud9am*, *Cloud3pm* *(number of eighths of sky)*
+            - **Pressure**: *Pressure9am*, *Pressure3pm* *(hpa)*
+        - Singular features:
+            - *Date*
+            - *Location*
+            - *Rainfall (mm)*
+            - *Evaporation (mm)*
+            - *Sunshine (hours of bright sunshine)*
+            - *RainToday ("Yes" if >1mm of rain)*
 
+    ''')
 
+    st_utils.minor_div()
 
-st.image(DATA_PATH + 'nunique.png')
-st.write('''
-    - continuous features: *Temperature, Rainfall, Evaporation, Sunshine, WindSpeed, Humidity, Pressure*
-    - categorical features: *Date, Location, WindDir, Cloud, RainToday*
-''')
+    # st.write('')
+    # st.dataframe(pd.read_csv(DATA_PATH + 'cols_info.csv'))
 
-st_utils.minor_div()
 
-st.image(DATA_PATH + 'heatmap.png')
 
-st_utils.minor_div()
+    st_utils.image(DATA_PATH + 'nunique.png')
+    st.write('''
+        - continuous features: *Temperature, Rainfall, Evaporation, Sunshine, WindSpeed, Humidity, Pressure*
+        - categorical features: *Date, Location, WindDir, Cloud, RainToday*
+    ''')
 
+    st_utils.minor_div()
 
+    if weather_store.store_exists():
+        st_utils.correlation_heatmap(streaming_corr.CORRELATION_PATHS['weather'], DATA_PATH + 'heatmap.png',
+                                     correlations(store_version()))
+    else:
+        st_utils.image(DATA_PATH + 'heatmap.png')
 
-st.divider()
-st.markdown('<a name="#handling-missing-data"></a>', unsafe_allow_html=True)
-st.write('## Handling Missing Data')
-st.write('''
-    - Total missing values: 644,978 (11.85 %)
-    - Rows with missing values: 140,583  (61.97 %)
-''')
-st.image(DATA_PATH + 'missing.png')
+    st_utils.minor_div()
 
 
-st.image(DATA_PATH + 'missing_cols_by_loc.png')
+@sections.section('handling-missing-data', 'Handling Missing Data', lazy=True)
+def handling_missing_data():
+    if weather_store.store_exists():
+        explore_missing()
+        return
 
+    st.write('''
+        - Total missing values: 644,978 (11.85 %)
+        - Rows with missing values: 140,583  (61.97 %)
+    ''')
+    st_utils.image(DATA_PATH + 'missing.png')
 
-st.divider()
-st.markdown('<a name="feature-engineering"></a>', unsafe_allow_html=True)
-st.write('''
-         ## Feature Engineering
-         
-         
-         Currently in the process of migrating this project here from its original location.''')
 
+    st_utils.image(DATA_PATH + 'missing_cols_by_loc.png')
 
 
-st.divider()
-st.markdown('<a name="scaling"></a>', unsafe_allow_html=True)
-st.write('''## Scaling
-         
-         *in the works*''')
+@sections.section('feature-engineering', 'Feature Engineering')
+def feature_engineering():
+    st.write('Currently in the process of migrating this project here from its original location.')
 
 
-st.divider()
-st.markdown('<a name="modeling"></a>', unsafe_allow_html=True)
-st.write('''## Modeling
-         
-         
-         *in the works*''')
+@sections.section('scaling', 'Scaling')
+def scaling():
+    st.write('*in the works*')
 
-st.write('''
 
-''')
+@sections.section('modeling', 'Modeling')
+def modeling():
+    if weather_store.store_exists() and weather_predict.model_available():
+        show_rain_tomorrow()
+    else:
+        st.write('*in the works*')
 
 
+@sections.section('evaluation', 'Evaluation & Insights')
+def evaluation():
+    st.write('*in the works*')
 
+    # st.image(DATA_PATH + 'roc_pr_curves.png')
+    st.markdown('<hr style="border:0.5px solid #FFDFC2;"/>', unsafe_allow_html=True)
+    # st.image(DATA_PATH + 'permutation_importance.png')
 
 
-st.divider()
-st.markdown('<a name="evaluation"></a>', unsafe_allow_html=True)
-st.write('''## Evaluation
-         
-         *in the works*''')
+@sections.section('final-thoughts', 'Final Thoughts')
+def final_thoughts():
+    st.write('*in the works*')
 
-# st.image(DATA_PATH + 'roc_pr_curves.png')
-st.markdown('<hr style="border:0.5px solid #FFDFC2;"/>', unsafe_allow_html=True)
-# st.image(DATA_PATH + 'permutation_importance.png')
 
-st.divider()
-st.markdown('<a name="final-thoughts"></a>', unsafe_allow_html=True)
-st.write('''## Final Thoughts
-         
+# Table of Contents
+sections.table_of_contents()
+st.sidebar.divider()
+st_utils.get_sidebar_links()
 
-         *in the works*''')
\ No newline at end of file
+sections.render()
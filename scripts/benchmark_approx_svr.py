@@ -0,0 +1,85 @@
+"""Benchmark of the kernel-approximated ApproxSVR against exact SVR on the Mohs hardness task.
+
+Usage (from the repository root):
+    python -m scripts.benchmark_approx_svr --csv train.csv --output approx_svr.csv
+    python -m scripts.benchmark_approx_svr --synthetic 10000 --base SVR ApproxSVR LGBMRegressor
+
+Both are cross-validated on the same folds as base estimators and as the final estimator of
+a stacking model, once on top of the exact SVR and once with ApproxSVR as base estimator too
+(the fully approximate pipeline). The stacking runtimes are end-to-end, base OOF predictions
+included, like the Runtime column of data/mohs_hardness/results.csv; its rows for the exact
+models are printed alongside (only comparable when run on the competition's train.csv).
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn import svm
+
+# Local imports
+from ds_utils import model_comparison
+from ds_utils.approx_svr import ApproxSVR
+from ds_utils.oof_cache import OOFCache
+from scripts.compare_models import synthetic
+from scripts.stack_models import evaluate
+
+# Paths
+RESULTS_PATH = 'data/mohs_hardness/results.csv'
+
+# Settings
+BASES = ['SVR', 'RandomForestRegressor', 'XGBRegressor', 'LGBMRegressor']      # the page's stacking bases
+SYNTHETIC_ROWS = 10_000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', help='the competition training data (train.csv)')
+    parser.add_argument('--synthetic', type=int, default=SYNTHETIC_ROWS, metavar='ROWS',
+                        help='rows of the random stand-in table used without --csv')
+    parser.add_argument('--base', nargs='+', help='stacking base estimators (default: the available of BASES)')
+    parser.add_argument('--splits', type=int, default=model_comparison.N_SPLITS)
+    parser.add_argument('--workers', type=int, help='processes for the base estimators (default: number of CPUs)')
+    parser.add_argument('--cache', default=None, help='OOF cache directory')
+    parser.add_argument('--output', help='write the measured rows, shaped like results.csv, to this path')
+    args = parser.parse_args(argv)
+
+    task = model_comparison.TASKS['mohs']
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        X, y = df.drop(columns=[task.target, 'id'], errors='ignore'), df[task.target]
+    else:
+        X, y = synthetic('mohs', args.synthetic)
+    X, y = np.asarray(X, dtype=np.float32), np.asarray(y)
+    print(f'{len(X):,} rows' + ('' if args.csv else ' (synthetic)'))
+
+    records = model_comparison.compare('mohs', X, y, ['SVR', 'ApproxSVR'], args.splits, args.workers)
+    rows = model_comparison.summarize(records).to_dict('records')
+
+    cache = OOFCache(args.cache) if args.cache else OOFCache()
+    folds = task.folds(y, args.splits)
+    exact_bases = [name for name in args.base or BASES if name in task.available()]
+    approx_bases = ['ApproxSVR' if name == 'SVR' else name for name in exact_bases]
+    stacks = {
+        'Stacking(SVM)': (svm.SVR(), exact_bases),
+        'Stacking(ApproxSVM)': (ApproxSVR(random_state=model_comparison.SEED), exact_bases),
+        'Stacking(ApproxSVM, approx. bases)': (ApproxSVR(random_state=model_comparison.SEED), approx_bases),
+    }
+    for name, (final, bases) in stacks.items():
+        bases = {base: model_comparison.make_pipeline_for(task, base) for base in bases}
+        losses, ledger = evaluate(task, name, final, False, bases, X, y, folds, cache)
+        rows.append({'Model Name': name, 'Loss Mean': np.mean(losses), 'Loss Std': np.std(losses),
+                     'Runtime': ledger.end_to_end_s, 'Group': 'Shallow Stacked'})
+    measured = pd.DataFrame(rows)
+
+    reference = pd.read_csv(RESULTS_PATH)
+    reference = reference[reference['Model Name'].isin(['SVR', 'Stacking(SVM)'])]
+    table = pd.concat([reference.assign(Source='results.csv'), measured.assign(Source='measured')])
+    print(table.to_string(index=False, float_format='{:.4f}'.format))
+    if args.output:
+        measured.sort_values('Loss Mean', ascending=False).to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Benchmark of the flat_trees exports against the fitted models they came from.
+
+Usage (from the repository root, after `python -m ds_utils.smoker_models ...`):
+    python -m scripts.benchmark_flat_trees
+    python -m scripts.benchmark_flat_trees --models StackingClassifier --batches 1 100
+
+For every stored model with a flat export, both score batches of holdout rows given as a
+numpy array (as the page's prediction form does); the time is the median over `--repeat` calls.
+Max diff is the largest difference of the predicted probabilities over the whole holdout set.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# Local imports
+from ds_utils import smoker_models
+
+# Settings
+BATCHES = [1, 10, 1000]
+REPEAT = 50
+
+
+def measure(predict, X, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='+', help='stored models to benchmark (default: all with a flat export)')
+    parser.add_argument('--batches', nargs='+', type=int, default=BATCHES, help='rows per call')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+
+    names = args.models or smoker_models.flat_names()
+    if not names:
+        print('no flat smoker models stored, train some with `python -m ds_utils.smoker_models`')
+        return 1
+    X, y = smoker_models.load_holdout()
+    X = X.to_numpy(dtype=np.float64)
+    print(f'{len(X):,} holdout rows')
+    print(f'{"model":<32} {"rows":>5} {"fitted":>10} {"flat":>10} {"speedup":>8} {"max diff":>9}')
+    for name in names:
+        model, flat = smoker_models.get(name), smoker_models.get_flat(name)
+        diff = np.abs(model.predict_proba(X)[:, 1] - flat.predict_proba(X)[:, 1]).max()
+        for rows in args.batches:
+            fitted_s = measure(model.predict_proba, X[:rows], args.repeat)
+            flat_s = measure(flat.predict_proba, X[:rows], args.repeat)
+            print(f'{name:<32} {rows:>5} {1e6 * fitted_s:>8.0f}µs {1e6 * flat_s:>8.0f}µs {fitted_s / flat_s:>7.1f}x '
+                  f'{diff:>9.1e}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
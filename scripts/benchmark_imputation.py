@@ -0,0 +1,102 @@
+"""Benchmark of the weather imputation: naive `groupby().apply` vs. vectorized vs. streamed.
+
+Usage (from the repository root, needs the store built by `python -m ds_utils.weather_store`):
+    python -m scripts.benchmark_imputation
+    python -m scripts.benchmark_imputation --repeat 5 --output benchmarks/imputation.json
+
+Every variant starts from the store on disk, so loading is part of the measurement. Peak memory
+is what tracemalloc sees being allocated (numpy, pandas and pyarrow buffers included) on top of
+what was allocated before the run. The vectorized and naive results are checked to be equal.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Local imports
+from ds_utils import weather_impute, weather_store
+
+# Settings
+REPEAT = 3
+
+
+def naive(medians):
+    return weather_impute.naive_impute(weather_store.load(), medians)
+
+
+def vectorized(medians):
+    return weather_impute.impute(weather_store.load(), medians)
+
+
+def streamed(medians):
+    rows = 0
+    for chunk in weather_impute.impute_store(medians=medians):
+        rows += len(chunk)
+    return rows
+
+
+def measure(func, medians, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(medians)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(medians)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'peak_mb': peak / 2**20}
+
+
+def same_result(a, b):
+    for col in a.columns:
+        x, y = a[col], b[col]
+        if x.dtype.kind == 'f':
+            if not np.allclose(x, y, rtol=1e-5, atol=1e-4, equal_nan=True):
+                return False
+        elif not x.astype(object).fillna('').equals(y.astype(object).fillna('')):
+            return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    if not weather_store.store_exists():
+        print(f'no store at {weather_store.STORE_PATH}, build it with `python -m ds_utils.weather_store`')
+        return 1
+
+    medians = weather_impute.month_medians()
+    df = weather_store.load()
+    missing = int(df[weather_impute.MEASUREMENTS].isna().sum().sum())
+    print(f'{len(df):,} rows, {missing:,} missing measurements')
+    if not same_result(vectorized(medians), naive(medians)):
+        print('vectorized and naive imputation differ')
+        return 1
+    del df
+
+    results = {name: measure(func, medians, args.repeat) for name, func in
+               [('naive', naive), ('vectorized', vectorized), ('streamed', streamed)]}
+    base = results['naive']['median_s']
+    print(f'{"variant":<12} {"median":>8} {"min":>8} {"speedup":>8} {"peak mem":>9}')
+    for name, r in results.items():
+        print(f'{name:<12} {r["median_s"]:>7.2f}s {r["min_s"]:>7.2f}s {base / r["median_s"]:>7.1f}x {r["peak_mb"]:>7.0f}MB')
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'missing_measurements': missing, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Render-time benchmark of every page, run headlessly through Streamlit's AppTest.
+
+Usage (from the repository root):
+    python -m scripts.benchmark_pages                                   # print results
+    python -m scripts.benchmark_pages --output benchmarks/pages.json    # write a new baseline
+    python -m scripts.benchmark_pages --compare benchmarks/pages.json   # exit 1 on regressions or exceptions
+
+Each page runs in a fresh subprocess, so its first run is a cold start (empty asset cache,
+only streamlit and st_utils imported). Per page it records:
+    - cold first-run and warm rerun wall times
+    - RSS before the first run and peak RSS afterwards
+    - files opened during the cold run and during the warm reruns (source files excluded)
+    - serialized bytes per element type plus media (image) bytes handed to the browser
+Lazy sections stay collapsed, i.e. the numbers describe what a new visitor's session costs.
+Record baselines from a clean checkout (e.g. `git worktree add`): the git-ignored local data
+(weather store, trained models, sketches, caches) switch pages to other, costlier code paths.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# Settings
+PAGES = ['1_🏠_Home.py'] + sorted(glob.glob('pages/*.py'))
+WARM_RUNS = 5
+TIMEOUT = 120
+REGRESSION_THRESHOLD = 0.2          # relative increase that counts as a regression
+COMPARED_METRICS = ['cold_s', 'warm_median_s', 'session_rss_mb', 'warm_file_reads', 'total_bytes']
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+def walk(node):
+    yield node
+    for child in getattr(node, 'children', {}).values():
+        yield from walk(child)
+
+
+def element_bytes(tree):
+    sizes = {}
+    for node in walk(tree):
+        proto = getattr(node, 'proto', None)
+        if proto is None or getattr(node, 'children', None):
+            continue
+        entry = sizes.setdefault(node.type, {'count': 0, 'bytes': 0})
+        entry['count'] += 1
+        entry['bytes'] += proto.ByteSize()
+    return sizes
+
+
+def measure(page, warm_runs):
+    """Benchmark a single page in the current process (called in the subprocess)."""
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import AppTest
+
+    root = os.path.abspath('.')
+    counter = {'phase': None, 'cold': 0, 'warm': 0}
+
+    def audit(event, args):
+        if event == 'open' and counter['phase'] and isinstance(args[0], str):
+            path = os.path.abspath(args[0])
+            if path.startswith(root) and not path.endswith(('.py', '.pyc')):
+                counter[counter['phase']] += 1
+
+    media = {'bytes': 0}
+    load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+
+    def counting_load_and_get_id(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, bytes):
+            media['bytes'] += len(path_or_data)
+        elif os.path.isfile(path_or_data):
+            media['bytes'] += os.path.getsize(path_or_data)
+        return load_and_get_id(self, path_or_data, *args, **kwargs)
+
+    MemoryMediaFileStorage.load_and_get_id = counting_load_and_get_id
+    sys.addaudithook(audit)
+
+    # Process-wide imports aren't part of a session's cost
+    import st_utils  # noqa: F401
+    at = AppTest.from_file(os.path.abspath(page), default_timeout=TIMEOUT)
+    rss_before = rss_mb()
+
+    counter['phase'] = 'cold'
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+    counter['phase'] = None
+    elements = element_bytes(at._tree)
+    media_bytes = media['bytes']
+
+    warm = []
+    counter['phase'] = 'warm'
+    for _ in range(warm_runs):
+        start = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - start)
+    counter['phase'] = None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'cold_s': cold,
+        'warm_median_s': statistics.median(warm),
+        'warm_min_s': min(warm),
+        'rss_before_mb': rss_before,
+        'peak_rss_mb': peak_rss,
+        'session_rss_mb': peak_rss - rss_before,
+        'cold_file_reads': counter['cold'],
+        'warm_file_reads': counter['warm'] / warm_runs,
+        'elements': elements,
+        'element_bytes': sum(e['bytes'] for e in elements.values()),
+        'media_bytes': media_bytes,
+        'total_bytes': media_bytes + sum(e['bytes'] for e in elements.values()),
+        'exceptions': [e.value for e in at.exception],
+    }
+
+
+def run_page(page, warm_runs):
+    proc = subprocess.run(
+        [sys.executable, '-m', 'scripts.benchmark_pages', '--page', page, '--warm-runs', str(warm_runs)],
+        capture_output=True, text=True, timeout=TIMEOUT * (warm_runs + 1),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'benchmark of {page} failed:\n{proc.stderr}')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f'{"page":<48} {"cold":>7} {"warm":>7} {"rss":>7} {"reads":>11} {"sent":>8}')
+    for page, r in results['pages'].items():
+        print(
+            f'{os.path.basename(page):<48} {r["cold_s"]:>6.2f}s {r["warm_median_s"]:>6.3f}s '
+            f'{r["session_rss_mb"]:>5.0f}MB {r["cold_file_reads"]:>4}/{r["warm_file_reads"]:<6.1f}'
+            f'{r["total_bytes"] / 1024:>6.0f}KB'
+        )
+        for exc in r['exceptions']:
+            print(f'    exception: {exc}')
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human readable regressions of `results` against `baseline`.
+
+    A page that raises is always one, whether or not it raised in the baseline too: an error
+    page renders faster than the real one, so its timings mean nothing.
+    """
+    regressions = []
+    for page, r in results['pages'].items():
+        regressions += [f'{os.path.basename(page)}: raised {exc}' for exc in r['exceptions']]
+        base = baseline['pages'].get(page)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base[metric], r[metric]
+            if old and (new - old) / old > threshold:
+                regressions.append(f'{os.path.basename(page)}: {metric} {old:.3g} -> {new:.3g} (+{(new - old) / old:.0%})')
+            elif not old and new:
+                regressions.append(f'{os.path.basename(page)}: {metric} 0 -> {new:.3g}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--page', help=argparse.SUPPRESS)
+    parser.add_argument('--warm-runs', type=int, default=WARM_RUNS)
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.page:
+        print(json.dumps(measure(args.page, args.warm_runs)))
+        return 0
+
+    import streamlit
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'streamlit': streamlit.__version__,
+        'warm_runs': args.warm_runs,
+        'pages': {page: run_page(page, args.warm_runs) for page in PAGES},
+    }
+    print_results(results)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f'\nCompared to {args.compare} ({baseline.get("commit")}):')
+        for line in regressions or ['no regressions']:
+            print(f'  {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Benchmark of SketchQuantileTransformer against sklearn's QuantileTransformer on the skewed smoker columns.
+
+Usage (from the repository root):
+    python -m scripts.benchmark_quantile_scaling --csv train.csv test.csv    # the competition data
+    python -m scripts.benchmark_quantile_scaling                             # synthetic stand-in
+
+Every variant is fitted on all rows and maps them to the uniform distribution. Accuracy is the
+difference to the exact mid-rank of every value (the empirical CDF, ties averaged), in
+quantiles: mean and max over all values of the scaled columns. Peak memory is what
+tracemalloc sees allocated during the fit, state is the pickled size of the fitted transformer.
+The sketch is also fitted chunk by chunk and merged from four parts, as separate workers would.
+"""
+import argparse
+import pickle
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.preprocessing import QuantileTransformer
+
+# Local imports
+from ds_utils.sketch_quantile_scaler import SketchQuantileTransformer
+from scripts.benchmark_smoker_features import N_ROWS, synthetic
+
+# Settings
+SCALED_COLUMNS = ['eyesight(left)', 'eyesight(right)', 'fasting blood sugar', 'LDL', 'serum creatinine', 'AST',
+                  'ALT', 'Gtp']
+CHUNKSIZE = 50_000
+WORKERS = 4
+REPEAT = 3
+
+
+def measure(fit, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fit()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fitted = fit()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return fitted, statistics.median(times), peak / 2**20
+
+
+def chunked(X):
+    scaler = SketchQuantileTransformer(output_distribution='uniform')
+    for start in range(0, len(X), CHUNKSIZE):
+        scaler.partial_fit(X[start:start + CHUNKSIZE])
+    return scaler
+
+
+def merged(X):
+    parts = [SketchQuantileTransformer(output_distribution='uniform').fit(part)
+             for part in np.array_split(X, WORKERS)]
+    scaler = parts[0]
+    for part in parts[1:]:
+        scaler = scaler.merge(part)
+    return scaler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', nargs='+', help='CSV files with the INPUT_COLUMNS (e.g. train.csv test.csv)')
+    parser.add_argument('--rows', type=int, default=N_ROWS, help='rows of the synthetic table')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+
+    df = pd.concat([pd.read_csv(path) for path in args.csv], ignore_index=True) if args.csv else synthetic(args.rows)
+    X = df[SCALED_COLUMNS].to_numpy(dtype=np.float64)
+    exact = np.column_stack([(rankdata(col) - 0.5) / len(col) for col in X.T])
+
+    variants = {
+        'QuantileTransformer': lambda: QuantileTransformer(subsample=None).fit(X),
+        'QuantileTransformer (10k sample)': lambda: QuantileTransformer(subsample=10_000, random_state=0).fit(X),
+        'Sketch': lambda: SketchQuantileTransformer(output_distribution='uniform').fit(X),
+        f'Sketch ({CHUNKSIZE:,}-row chunks)': lambda: chunked(X),
+        f'Sketch (merged from {WORKERS})': lambda: merged(X),
+    }
+    print(f'{len(X):,} rows x {len(SCALED_COLUMNS)} columns ({", ".join(SCALED_COLUMNS)})')
+    print(f'{"variant":<34} {"fit":>8} {"transform":>10} {"peak mem":>9} {"state":>8} {"mean err":>9} {"max err":>8}')
+    for name, fit in variants.items():
+        scaler, fit_s, peak_mb = measure(fit, args.repeat)
+        start = time.perf_counter()
+        scaled = scaler.transform(X)
+        transform_s = time.perf_counter() - start
+        error = np.abs(scaled - exact)
+        state_kb = len(pickle.dumps(scaler)) / 1024
+        print(f'{name:<34} {1000 * fit_s:>6.0f}ms {1000 * transform_s:>8.0f}ms {peak_mb:>7.1f}MB {state_kb:>6.0f}KB '
+              f'{error.mean():>9.5f} {error.max():>8.5f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
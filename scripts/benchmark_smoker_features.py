@@ -0,0 +1,86 @@
+"""Benchmark of the smoker feature engineering: SmokerFeatures vs. a straightforward pandas version.
+
+Usage (from the repository root):
+    python -m scripts.benchmark_smoker_features --csv train.csv test.csv    # the competition data
+    python -m scripts.benchmark_smoker_features                             # synthetic stand-in
+
+The competition's train and test sets (265,427 rows together) aren't part of the repository.
+Without `--csv`, a synthetic table of the same size is drawn from the column statistics in
+data/smoker_status/feature_info.csv. Both implementations start from the same DataFrame; peak
+memory is what tracemalloc sees allocated on top of it. Their outputs are checked to be equal.
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils.smoker_features import INPUT_COLUMNS, SmokerFeatures, pandas_features
+
+# Paths
+FEATURE_INFO_PATH = 'data/smoker_status/feature_info.csv'
+
+# Settings
+N_ROWS = 265_427
+REPEAT = 5
+
+
+def synthetic(n_rows, seed=0):
+    info = pd.read_csv(FEATURE_INFO_PATH, index_col=0)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(index=range(n_rows))
+    for col in INPUT_COLUMNS:
+        row = info.loc[col]
+        values = np.clip(rng.normal(row['mean'], row['std'], n_rows), row['min'], row['max'])
+        df[col] = values.round().astype(row['dtypes']) if row['dtypes'].startswith('int') else values.round(1)
+    for col in ['eyesight(left)', 'eyesight(right)']:
+        df.loc[rng.random(n_rows) < 0.002, col] = 9.9
+    return df
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak / 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', nargs='+', help='CSV files with the INPUT_COLUMNS (e.g. train.csv test.csv)')
+    parser.add_argument('--rows', type=int, default=N_ROWS, help='rows of the synthetic table')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+
+    df = pd.concat([pd.read_csv(path) for path in args.csv], ignore_index=True) if args.csv else synthetic(args.rows)
+    transformer = SmokerFeatures().fit(df)
+    vectorized = transformer.transform(df)
+    baseline = pandas_features(df, transformer.clip_upper_)
+    if not np.allclose(vectorized, baseline.to_numpy(), rtol=1e-5, atol=1e-4):
+        print('SmokerFeatures and the pandas version differ')
+        return 1
+
+    print(f'{len(df):,} rows -> {vectorized.shape[1]} features')
+    print(f'{"variant":<16} {"median":>9} {"peak mem":>9} {"output":>8}')
+    results = [
+        ('pandas', measure(lambda: pandas_features(df, transformer.clip_upper_), args.repeat), baseline),
+        ('SmokerFeatures', measure(lambda: transformer.transform(df), args.repeat), vectorized),
+    ]
+    for name, (seconds, peak_mb), out in results:
+        nbytes = out.memory_usage(deep=True).sum() if isinstance(out, pd.DataFrame) else out.nbytes
+        print(f'{name:<16} {1000 * seconds:>7.1f}ms {peak_mb:>7.1f}MB {nbytes / 2**20:>6.1f}MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
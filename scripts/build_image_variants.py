@@ -0,0 +1,176 @@
+"""Build width-bucketed, recompressed variants of the plot PNGs in data/*/ plus a manifest.
+
+Usage (from the repository root):
+    python -m scripts.build_image_variants          # (re)build stale variants and print the page weight report
+    python -m scripts.build_image_variants --check  # exit with status 1 if any variant is missing or stale
+
+Streamlit itself shrinks every image wider than 1460 px on each rerun and then ships it as PNG,
+so the full-resolution 4500 px plots cost both server CPU and page weight. The variants produced
+here are already at their final width and format, so `st_utils.image` can hand them through untouched.
+"""
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+
+from PIL import Image
+
+# Local imports
+from st_utils import IMAGE_MANIFEST_PATH, DEFAULT_COLUMN_WIDTH, PIXEL_RATIO, STREAMLIT_MAX_IMAGE_WIDTH
+
+# Settings
+SOURCE_GLOB = 'data/*/*.png'
+VARIANT_DIR = 'variants'
+WIDTHS = (480, 960, STREAMLIT_MAX_IMAGE_WIDTH)
+JPEG_QUALITY = 85
+PHOTO_RATIO = 0.25      # JPEG below this fraction of a lossless PNG means the image is a photo, not a plot
+
+
+def sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def has_transparency(img):
+    return img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema()[0] < 255
+
+
+def encode(img):
+    """Return (bytes, format): JPEG for opaque photos, 256-colour PNG for plots."""
+    if not has_transparency(img):
+        rgb = img.convert('RGB')
+        lossless, jpeg = io.BytesIO(), io.BytesIO()
+        rgb.save(lossless, format='PNG', optimize=True)
+        rgb.save(jpeg, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        if jpeg.tell() < PHOTO_RATIO * lossless.tell():
+            return jpeg.getvalue(), 'JPEG'
+
+    png = io.BytesIO()
+    img.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(png, format='PNG', optimize=True)
+    return png.getvalue(), 'PNG'
+
+
+def build_variants(path):
+    img = Image.open(path)
+    img.load()
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA')
+    width, height = img.size
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out_dir = os.path.join(os.path.dirname(path), VARIANT_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    variants = []
+    for target in sorted({min(w, width) for w in WIDTHS}):
+        resized = img if target == width else img.resize((target, round(height * target / width)), Image.LANCZOS)
+        data, fmt = encode(resized)
+        out_path = os.path.join(out_dir, f'{stem}.w{target}.{"jpg" if fmt == "JPEG" else "png"}')
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        variants.append({'path': out_path, 'width': target, 'bytes': len(data), 'format': fmt})
+
+    return {
+        'sha1': sha1(path),
+        'width': width,
+        'height': height,
+        'bytes': os.path.getsize(path),
+        'variants': variants,
+    }
+
+
+def is_stale(path, entry):
+    return (
+        entry is None
+        or entry['sha1'] != sha1(path)
+        or not all(os.path.exists(v['path']) for v in entry['variants'])
+    )
+
+
+def served_bytes_before(path):
+    """Size of what Streamlit sends for the original file (resized to its max width, re-encoded as PNG)."""
+    img = Image.open(path)
+    if img.width <= STREAMLIT_MAX_IMAGE_WIDTH:
+        return os.path.getsize(path)
+    img = img.resize((STREAMLIT_MAX_IMAGE_WIDTH, int(img.height * STREAMLIT_MAX_IMAGE_WIDTH / img.width)), Image.BILINEAR)
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.tell()
+
+
+def page_images(page_path):
+    """Image paths rendered by a page script, resolved from its DATA_PATH/TITLE_IMG_PATH constants."""
+    with open(page_path, encoding='utf-8') as f:
+        source = f.read()
+    consts = dict(re.findall(r"^(DATA_PATH|TITLE_IMG_PATH) = '([^']*)'", source, flags=re.M))
+    images = []
+    for line in source.splitlines():
+        if line.lstrip().startswith('#'):
+            continue
+        for ref in re.findall(r"(?:st_utils\.image|load_image|st\.image)\((DATA_PATH \+ '[^']+'|TITLE_IMG_PATH)", line):
+            if ref == 'TITLE_IMG_PATH':
+                images.append(consts['TITLE_IMG_PATH'])
+            else:
+                images.append(consts['DATA_PATH'] + ref.split("'")[1])
+    return images
+
+
+def report(manifest):
+    needed = DEFAULT_COLUMN_WIDTH * PIXEL_RATIO
+    rows = []
+    for page in ['1_🏠_Home.py'] + sorted(glob.glob('pages/*.py')):
+        before_file = before_served = after = 0
+        images = [p for p in page_images(page) if os.path.exists(p)]
+        for path in images:
+            entry = manifest[os.path.normpath(path)]
+            fitting = [v for v in entry['variants'] if v['width'] >= needed] or entry['variants'][-1:]
+            before_file += entry['bytes']
+            before_served += served_bytes_before(path)
+            after += min(fitting, key=lambda v: v['width'])['bytes']
+        rows.append((os.path.basename(page), len(images), before_file, before_served, after))
+
+    print(f'\nImage bytes per page (column width {DEFAULT_COLUMN_WIDTH}px x{PIXEL_RATIO}):')
+    print(f'{"page":<50} {"images":>6} {"original":>10} {"served":>10} {"variants":>10} {"saved":>7}')
+    for name, n, before_file, before_served, after in rows:
+        saved = 1 - after / before_served if before_served else 0
+        print(f'{name:<50} {n:>6} {before_file / 1024:>8.0f}KB {before_served / 1024:>8.0f}KB {after / 1024:>8.0f}KB {saved:>6.0%}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='only check whether the variants are up to date')
+    parser.add_argument('--force', action='store_true', help='rebuild all variants')
+    parser.add_argument('--no-report', action='store_true', help='skip the bytes-per-page report')
+    args = parser.parse_args(argv)
+
+    manifest = {}
+    if os.path.exists(IMAGE_MANIFEST_PATH):
+        with open(IMAGE_MANIFEST_PATH) as f:
+            manifest = json.load(f)
+
+    sources = sorted(p for p in glob.glob(SOURCE_GLOB) if os.sep + VARIANT_DIR + os.sep not in p)
+    stale = [p for p in sources if args.force or is_stale(p, manifest.get(os.path.normpath(p)))]
+
+    if args.check:
+        for path in stale:
+            print(f'stale: {path}')
+        return 1 if stale else 0
+
+    for path in stale:
+        manifest[os.path.normpath(path)] = build_variants(path)
+        print(f'built: {path}')
+    manifest = {k: v for k, v in sorted(manifest.items()) if os.path.exists(k)}
+    with open(IMAGE_MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if not args.no_report:
+        report(manifest)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Compare the models of the Smoker or Mohs project with parallel, shared-memory cross validation.
+
+Usage (from the repository root):
+    python -m scripts.compare_models mohs --csv train.csv --output results.csv --folds folds.csv
+    python -m scripts.compare_models smoker --csv train.csv --costs folds.csv     # schedule by measured runtimes
+    python -m scripts.compare_models smoker --synthetic 20000 --models LogisticRegression LinearSVC
+
+The competition CSVs aren't part of the repository; `--synthetic N` runs the harness on a
+random table with the task's columns instead (useful to check the setup, not the models).
+`--output` gets the results.csv-shaped summary and `--folds` one row per (model, fold). Every
+record is also appended to the task's experiment log (ds_utils.experiment_log) as its fold
+finishes, unless `--no-log` is given; the Mohs page renders the comparison from there.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils import experiment_log, model_comparison
+from ds_utils.smoker_features import INPUT_COLUMNS
+
+# Paths
+MOHS_HEAD_PATH = 'data/mohs_hardness/head.csv'
+
+
+def synthetic(task, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    if task == 'smoker':
+        from scripts.benchmark_smoker_features import synthetic as smoker_table
+        df = smoker_table(n_rows, seed)
+        z = (df - df.mean()) / df.std()
+        logit = 1.2 * z['hemoglobin'] + 0.8 * z['height(cm)'] + 0.6 * np.log1p(df['Gtp']) - 0.4 * z['age'] - 2
+        df['smoking'] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+        return df[INPUT_COLUMNS], df['smoking']
+
+    columns = [c for c in pd.read_csv(MOHS_HEAD_PATH, nrows=0).columns if c != 'Hardness']
+    X = pd.DataFrame(rng.lognormal(0, 0.5, (n_rows, len(columns))), columns=columns)
+    y = np.clip(2 + 3 * np.tanh(X.iloc[:, 1] - 1) + X.iloc[:, 4] + rng.normal(0, 0.5, n_rows), 1, 10)
+    return X, pd.Series(y, name='Hardness')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('task', choices=list(model_comparison.TASKS))
+    parser.add_argument('--csv', help='training data with the feature columns and the target')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a random table of this many rows instead')
+    parser.add_argument('--models', nargs='+', help='subset of the models to compare')
+    parser.add_argument('--splits', type=int, default=model_comparison.N_SPLITS)
+    parser.add_argument('--workers', type=int, help='processes (default: number of CPUs)')
+    parser.add_argument('--costs', help='per-fold CSV of a previous run, to schedule by its measured runtimes')
+    parser.add_argument('--output', help='write the results.csv-shaped summary to this path')
+    parser.add_argument('--folds', help='write the per-fold records to this path')
+    parser.add_argument('--log', help='experiment log to append to (default: the task\'s LOG_PATHS entry)')
+    parser.add_argument('--no-log', action='store_true', help='don\'t append to an experiment log')
+    args = parser.parse_args(argv)
+
+    task = model_comparison.TASKS[args.task]
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        X = df[INPUT_COLUMNS] if args.task == 'smoker' else df.drop(columns=[task.target, 'id'], errors='ignore')
+        y = df[task.target]
+    elif args.synthetic:
+        X, y = synthetic(args.task, args.synthetic)
+    else:
+        parser.error('pass --csv or --synthetic')
+
+    costs = model_comparison.costs_from(pd.read_csv(args.costs).to_dict('records')) if args.costs else None
+    missing = set(task.models) - set(task.available())
+    if missing and not args.models:
+        print(f'skipping {", ".join(sorted(missing))} (not installed)')
+
+    run = None
+    if not args.no_log:
+        log = experiment_log.open_log(args.log or experiment_log.LOG_PATHS[args.task])
+        run = log.start_run(args.task, np.asarray(X, dtype=np.float32), np.asarray(y))
+
+    def report(r):
+        print(f'{r["finished_s"]:>7.1f}s  {r["model"]:<32} fold {r["fold"]}  loss {r["loss"]:.4f}  '
+              f'fit {r["fit_s"]:.2f}s  predict {r["predict_s"]:.2f}s  +{r["peak_mem_mb"]:.0f}MB')
+        if run is not None:
+            run.record(r)
+
+    start = time.perf_counter()
+    records = model_comparison.compare(args.task, X, y, args.models, args.splits, args.workers, costs=costs,
+                                       on_record=report)
+    wall = time.perf_counter() - start
+    busy = sum(r['fit_s'] + r['predict_s'] for r in records)
+    summary = model_comparison.summarize(records)
+    print(f'\n{summary.to_string(index=False)}')
+    print(f'\nwall {wall:.1f}s, {busy:.1f}s of fitting and predicting')
+
+    if args.output:
+        summary.to_csv(args.output, index=False)
+    if args.folds:
+        pd.DataFrame(records).to_csv(args.folds, index=False)
+    if run is not None:
+        print(f'run {run.id} logged to {run.log.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Concurrent-session load test against a locally started instance of the app.
+
+Usage (from the repository root):
+    python -m scripts.load_test                                  # 1, 5, 10 and 25 sessions
+    python -m scripts.load_test --sessions 1 50 --rounds 5 --output benchmarks/load.json
+
+Starts `streamlit run` on a free local port, then for every session count opens that many
+websocket sessions at once. Each session speaks Streamlit's own protocol (BackMsg/ForwardMsg
+protobufs over /_stcore/stream) and walks through the project pages linked on the Home page,
+`--rounds` times. A script run's latency is the time between sending `rerun_script` and
+receiving `script_finished`; server memory is the peak RSS sampled while the sessions are
+connected. Everything runs offline on the local machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+# Settings
+HOME_PAGE = '1_🏠_Home.py'
+SESSION_COUNTS = [1, 5, 10, 25]
+ROUNDS = 3
+STARTUP_TIMEOUT = 60
+RUN_TIMEOUT = 120
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def linked_pages():
+    """URL paths of the project pages linked on the Home page, in order."""
+    with open(HOME_PAGE, encoding='utf-8') as f:
+        return re.findall(r'href="[^"]*/(\w+)" target="_self"', f.read())
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class Server:
+    """`streamlit run` in a subprocess, bound to localhost only."""
+
+    def __init__(self, port):
+        self.port = port
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, '-m', 'streamlit', 'run', HOME_PAGE,
+                '--server.headless', 'true',
+                '--server.address', '127.0.0.1',
+                '--server.port', str(self.port),
+                '--server.fileWatcherType', 'none',
+                '--server.enableXsrfProtection', 'false',
+                '--browser.gatherUsageStats', 'false',
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/_stcore/health', timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f'streamlit did not come up on port {self.port}')
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+    @property
+    def rss_mb(self):
+        return rss_mb(self.proc.pid)
+
+
+class Session:
+    """A single browser tab, reduced to the websocket messages that drive script runs."""
+
+    def __init__(self, port):
+        self.url = f'ws://127.0.0.1:{port}/_stcore/stream'
+        self.ws = None
+        self.page_hashes = {}
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+        await self.run_page('')
+
+    async def close(self):
+        await self.ws.close()
+
+    async def run_page(self, url_path):
+        """Run the page behind `url_path` (empty for Home) and return (latency, had_exception)."""
+        # An unknown page hash makes Streamlit run Home, whose latencies would be reported as the page's
+        if url_path and url_path not in self.page_hashes:
+            raise ValueError(f'unknown page {url_path!r}, the app has: {", ".join(p for p in self.page_hashes if p)}')
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = self.page_hashes.get(url_path, '')
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+
+        had_exception = False
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await asyncio.wait_for(self.ws.recv(), RUN_TIMEOUT))
+            kind = reply.WhichOneof('type')
+            if kind in ('new_session', 'navigation'):       # newer Streamlit versions list all pages in the latter
+                self.page_hashes = {p.url_pathname: p.page_script_hash for p in getattr(reply, kind).app_pages}
+            elif kind == 'delta' and reply.delta.new_element.WhichOneof('type') == 'exception':
+                had_exception = True
+            elif kind == 'script_finished':
+                return time.perf_counter() - start, had_exception
+
+
+async def run_session(port, pages, rounds, latencies, errors):
+    session = Session(port)
+    await session.connect()
+    try:
+        for _ in range(rounds):
+            for page in pages:
+                latency, had_exception = await session.run_page(page)
+                latencies.setdefault(page, []).append(latency)
+                errors[page] = errors.get(page, 0) + had_exception
+    finally:
+        await session.close()
+
+
+async def sample_rss(server, peak):
+    while True:
+        peak[0] = max(peak[0], server.rss_mb)
+        await asyncio.sleep(0.1)
+
+
+async def load(server, n_sessions, pages, rounds):
+    latencies, errors, peak_rss = {}, {}, [0]
+    sampler = asyncio.create_task(sample_rss(server, peak_rss))
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(server.port, pages, rounds, latencies, errors) for _ in range(n_sessions)))
+    wall = time.perf_counter() - start
+    sampler.cancel()
+
+    all_latencies = [x for values in latencies.values() for x in values]
+    def summary(values):
+        return {
+            'runs': len(values),
+            'p50_s': percentile(values, 50),
+            'p95_s': percentile(values, 95),
+            'p99_s': percentile(values, 99),
+        }
+
+    return {
+        'sessions': n_sessions,
+        'wall_s': wall,
+        'throughput_runs_per_s': len(all_latencies) / wall,
+        'server_peak_rss_mb': peak_rss[0],
+        **summary(all_latencies),
+        'pages': {page: {**summary(values), 'errors': errors[page]} for page, values in latencies.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=SESSION_COUNTS)
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='walks through all pages per session')
+    parser.add_argument('--pages', nargs='+', help='URL paths to visit (default: all pages linked on Home)')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    pages = args.pages or linked_pages()
+    results = []
+    with Server(free_port()) as server:
+        # One warm-up session, so the first measured run doesn't pay for imports
+        asyncio.run(load(server, 1, pages, 1))
+        idle_rss = server.rss_mb
+        print(f'server idle RSS: {idle_rss:.0f} MB, pages: {", ".join(pages)}')
+        print(f'{"sessions":>8} {"runs":>6} {"p50":>8} {"p95":>8} {"p99":>8} {"runs/s":>8} {"RSS":>8} {"RSS/session":>12}')
+        for n in args.sessions:
+            result = asyncio.run(load(server, n, pages, args.rounds))
+            result['rss_per_session_mb'] = (result['server_peak_rss_mb'] - idle_rss) / n
+            results.append(result)
+            print(
+                f'{n:>8} {result["runs"]:>6} {result["p50_s"] * 1000:>6.0f}ms {result["p95_s"] * 1000:>6.0f}ms '
+                f'{result["p99_s"] * 1000:>6.0f}ms {result["throughput_runs_per_s"]:>8.1f} '
+                f'{result["server_peak_rss_mb"]:>6.0f}MB {result["rss_per_session_mb"]:>10.1f}MB'
+            )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'idle_rss_mb': idle_rss, 'pages': pages, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
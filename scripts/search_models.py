@@ -0,0 +1,75 @@
+"""Successive-halving hyperparameter search over the models of the Smoker or Mohs project.
+
+Usage (from the repository root):
+    python -m scripts.search_models mohs --csv train.csv --configs 27 --jobs 4
+    python -m scripts.search_models smoker --synthetic 20000 --models HistGradientBoostingClassifier --trials trials.csv
+
+See ds_utils.halving_search. The cross validation of every model's best configuration is
+appended to the task's experiment log as '<model> (tuned)' (unless `--no-log`), next to the
+untuned runs of scripts/compare_models.py; `--trials` gets one row per trial of every rung.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from ds_utils import experiment_log, halving_search, model_comparison
+from ds_utils.smoker_features import INPUT_COLUMNS
+from scripts.compare_models import synthetic
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('task', choices=list(model_comparison.TASKS))
+    parser.add_argument('--csv', help='training data with the feature columns and the target')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a random table of this many rows instead')
+    parser.add_argument('--models', nargs='+', help='subset of the models to search')
+    parser.add_argument('--configs', type=int, default=halving_search.N_CONFIGS, help='configurations per model')
+    parser.add_argument('--eta', type=int, default=halving_search.ETA, help='1/eta of the trials move up a rung')
+    parser.add_argument('--splits', type=int, default=model_comparison.N_SPLITS)
+    parser.add_argument('--jobs', type=int, help='parallel trials (default: number of CPUs)')
+    parser.add_argument('--trials', help='write every trial to this path')
+    parser.add_argument('--log', help='experiment log to append to (default: the task\'s LOG_PATHS entry)')
+    parser.add_argument('--no-log', action='store_true', help='don\'t append to an experiment log')
+    args = parser.parse_args(argv)
+
+    task = model_comparison.TASKS[args.task]
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        X = df[INPUT_COLUMNS] if args.task == 'smoker' else df.drop(columns=[task.target, 'id'], errors='ignore')
+        y = df[task.target]
+    elif args.synthetic:
+        X, y = synthetic(args.task, args.synthetic)
+    else:
+        parser.error('pass --csv or --synthetic')
+    X, y = np.asarray(X, dtype=np.float32), np.asarray(y)
+
+    run = None
+    if not args.no_log:
+        run = experiment_log.open_log(args.log or experiment_log.LOG_PATHS[args.task]).start_run(args.task, X, y)
+    start = time.perf_counter()
+
+    def report(t):
+        print(f'{time.perf_counter() - start:>7.1f}s  rung {t["rung"]}  {t["model"]:<32} trial {t["trial"]:>2}  '
+              f'budget {t["budget"]:>5.1%}  loss {t["loss"]:.4f}  fit {t["fit_s"]:.2f}s')
+
+    records, trials = halving_search.search(args.task, X, y, args.models, args.configs, args.eta, args.splits,
+                                            args.jobs, on_record=run.record if run else None, on_trial=report)
+    summary = experiment_log.summarize(pd.DataFrame(records).assign(run='', started=0, data_hash='', task=args.task))
+    print(f'\n{summary[["model", "loss_mean", "loss_std", "search_s", "fit_s", "runtime"]].to_string(index=False)}')
+    for record in {r['model']: r for r in records}.values():
+        print(f'{record["model"]:<40} {record["params"]}')
+    print(f'\nwall {time.perf_counter() - start:.1f}s, {len(trials)} trials')
+
+    if args.trials:
+        trials.to_csv(args.trials, index=False)
+    if run is not None:
+        print(f'run {run.id} logged to {run.log.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Voting, stacking and deep stacking on top of cached out-of-fold base predictions.
+
+Usage (from the repository root):
+    python -m scripts.stack_models mohs --csv train.csv --base SVR RandomForestRegressor LGBMRegressor
+    python -m scripts.stack_models smoker --synthetic 20000 --output stacked.csv
+
+The base estimators (the pipelines of ds_utils.model_comparison) are cross-validated once, and
+their OOF predictions are cached in data/oof_cache; every final estimator is then evaluated on
+the same folds. For each stacked model, two runtimes are reported: end-to-end (base OOF
+predictions + final estimator, i.e. the cost of the whole pipeline) and incremental (what this
+run actually spent). `--output` writes the end-to-end numbers in the shape of
+data/mohs_hardness/results.csv. Every fold of every stacked model is appended to the task's
+experiment log (ds_utils.experiment_log, unless `--no-log`), with its share of the base
+estimators' OOF predictions as feature generation time. The deep stacking uses sklearn's MLP
+in place of the notebook's Keras network.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn import linear_model, neural_network, svm
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Local imports
+from ds_utils import experiment_log, model_comparison
+from ds_utils.approx_svr import ApproxSVR
+from ds_utils.oof_cache import CostLedger, OOFCache, predict_scores
+from ds_utils.smoker_features import INPUT_COLUMNS
+from scripts.compare_models import synthetic
+
+
+def final_estimators(classification):
+    """name: (estimator or None for plain averaging, group, passthrough of the original features)"""
+    if classification:
+        return {
+            'VotingClassifier': (None, 'Shallow Stacked', False),
+            'Stacking(LogReg)': (linear_model.LogisticRegression(), 'Shallow Stacked', False),
+            'Stacking(SVM)': (svm.LinearSVC(), 'Shallow Stacked', False),
+            'DNNStackAll': (make_pipeline(StandardScaler(), neural_network.MLPClassifier(
+                hidden_layer_sizes=(64, 32), early_stopping=True, random_state=0)), 'Deep Stacked', True),
+        }
+    return {
+        'VotingRegressor': (None, 'Shallow Stacked', False),
+        'Stacking(LinReg)': (linear_model.LinearRegression(), 'Shallow Stacked', False),
+        'Stacking(SVM)': (svm.SVR(), 'Shallow Stacked', False),
+        'Stacking(ApproxSVM)': (ApproxSVR(random_state=0), 'Shallow Stacked', False),
+        'DNNStackAll': (make_pipeline(StandardScaler(), neural_network.MLPRegressor(
+            hidden_layer_sizes=(64, 32), early_stopping=True, random_state=0)), 'Deep Stacked', True),
+    }
+
+
+def evaluate(task, name, final, passthrough, bases, X, y, folds, cache, on_record=None):
+    """(fold losses, CostLedger); `on_record` gets a model_comparison-style record per fold."""
+    ledger = CostLedger()
+    stacked = cache.stack(bases, X, y, folds, ledger)
+    features_s = ledger.end_to_end_s / len(folds)       # each fold's share of the base OOF predictions
+    config = experiment_log.config_hash({'final': final, 'bases': bases, 'passthrough': passthrough})
+    if passthrough:
+        stacked = np.column_stack([X, stacked])
+    losses = []
+    with ledger.timed(name):
+        for fold, (train, test) in enumerate(folds):
+            with model_comparison.PeakMemory() as memory:
+                start = time.perf_counter()
+                model = final.fit(stacked[train], y[train]) if final is not None else None
+                fit_s = time.perf_counter() - start
+                start = time.perf_counter()
+                pred = stacked[test].mean(axis=1) if model is None else predict_scores(model, stacked[test])
+                predict_s = time.perf_counter() - start
+            losses.append(task.loss(y[test], pred))
+            if on_record is not None:
+                on_record({'model': name, 'fold': fold, 'loss': float(losses[-1]), 'features_s': features_s,
+                           'fit_s': fit_s, 'predict_s': predict_s, 'peak_mem_mb': memory.peak_mb,
+                           'config_hash': config})
+    return losses, ledger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('task', choices=list(model_comparison.TASKS))
+    parser.add_argument('--csv', help='training data with the feature columns and the target')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a random table of this many rows instead')
+    parser.add_argument('--base', nargs='+', help='base estimators (default: all available)')
+    parser.add_argument('--splits', type=int, default=model_comparison.N_SPLITS)
+    parser.add_argument('--cache', default=None, help='OOF cache directory')
+    parser.add_argument('--output', help='write the results.csv-shaped summary to this path')
+    parser.add_argument('--log', help='experiment log to append to (default: the task\'s LOG_PATHS entry)')
+    parser.add_argument('--no-log', action='store_true', help='don\'t append to an experiment log')
+    args = parser.parse_args(argv)
+
+    task = model_comparison.TASKS[args.task]
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        X = df[INPUT_COLUMNS] if args.task == 'smoker' else df.drop(columns=[task.target, 'id'], errors='ignore')
+        y = df[task.target]
+    elif args.synthetic:
+        X, y = synthetic(args.task, args.synthetic)
+    else:
+        parser.error('pass --csv or --synthetic')
+    X, y = np.asarray(X, dtype=np.float32), np.asarray(y)
+
+    cache = OOFCache(args.cache) if args.cache else OOFCache()
+    folds = task.folds(y, args.splits)
+    bases = {name: model_comparison.make_pipeline_for(task, name) for name in args.base or task.available()}
+    run = None
+    if not args.no_log:
+        run = experiment_log.open_log(args.log or experiment_log.LOG_PATHS[args.task]).start_run(args.task, X, y)
+
+    rows = []
+    print(f'{"model":<20} {"loss":>8} {"± std":>7} {"end-to-end":>11} {"incremental":>12}  cached bases')
+    for name, (final, group, passthrough) in final_estimators(task.classification).items():
+        on_record = (lambda record, group=group: run.record(record | {'group': group})) if run else None
+        losses, ledger = evaluate(task, name, final, passthrough, bases, X, y, folds, cache, on_record)
+        cached = sum(e['cached'] for e in ledger.entries)
+        print(f'{name:<20} {np.mean(losses):>8.4f} {np.std(losses):>7.4f} {ledger.end_to_end_s:>10.1f}s '
+              f'{ledger.incremental_s:>11.1f}s  {cached}/{len(bases)}')
+        rows.append({'Model Name': name, 'Loss Mean': np.mean(losses), 'Loss Std': np.std(losses),
+                     'Runtime': ledger.end_to_end_s, 'Group': group})
+
+    if args.output:
+        pd.DataFrame(rows).sort_values('Loss Mean', ascending=False).to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Local stand-in for the observations server, serving the fixture files offline.
+
+Usage (from the repository root):
+    python -m scripts.weather_fixture_server                # serve until Ctrl+C
+    python -m scripts.weather_fixture_server --demo         # run the fetch pipeline against it
+
+Serves FIXTURES_PATH under the same URL layout as the real server, with ETag and Last-Modified
+headers, 304 responses to conditional requests and an optional per-request delay, so the whole
+of ds_utils.weather_fetch (cache, conditional re-fetch, throttling, parsing) can be exercised
+without network access. The demo fetches the fixtures three times with a fresh cache: the first
+run downloads, the second is served from the cache and the third, with `refresh=True`, is
+revalidated with conditional requests.
+"""
+import argparse
+import contextlib
+import email.utils
+import hashlib
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Local imports
+from ds_utils import weather_fetch
+
+# Paths
+FIXTURES_PATH = 'data/australian_weather/fixtures'
+
+# Settings
+FIXTURE_STATIONS = {'Albury': 'ALBURY-FIXTURE'}
+FIXTURE_MONTHS = ['2008-12']
+
+
+class FixtureHandler(http.server.SimpleHTTPRequestHandler):
+    delay = 0.0
+    requests = []
+
+    def send_head(self):
+        time.sleep(self.delay)
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        mtime = os.stat(path).st_mtime
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+
+        if self.headers.get('If-None-Match') == etag or (
+                'If-None-Match' not in self.headers
+                and self.headers.get('If-Modified-Since') == email.utils.formatdate(mtime, usegmt=True)):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=windows-1252')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(mtime, usegmt=True))
+        self.end_headers()
+        return open(path, 'rb')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(directory=FIXTURES_PATH, delay=0.0, port=0):
+    """Serve `directory` on localhost in a background thread, yielding a URL template for it."""
+    handler = type('Handler', (FixtureHandler,), {'delay': delay, 'requests': []})
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', port), lambda *args: handler(*args, directory=os.path.abspath(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield f'http://{host}:{port}/' + '{month:%Y%m}/text/{station}.{month:%Y%m}.csv', handler.requests
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def demo(delay):
+    cache_path = tempfile.mkdtemp()
+    try:
+        with serve(delay=delay) as (url_template, requests):
+            fetcher = weather_fetch.Fetcher(cache_path, min_interval=0)
+            for label, refresh in [('cold', False), ('cached', False), ('revalidated', True)]:
+                fetcher.stats = dict.fromkeys(fetcher.stats, 0)
+                n_requests = len(requests)
+                start = time.perf_counter()
+                df = weather_fetch.fetch_observations(FIXTURE_STATIONS, FIXTURE_MONTHS, fetcher, url_template, refresh)
+                elapsed = time.perf_counter() - start
+                print(f'{label:<12} {1000 * elapsed:>7.1f}ms  {len(df)} rows  '
+                      f'{len(requests) - n_requests} requests  {fetcher.stats}')
+        print(df.to_string())
+        for failure in df.attrs['failures']:
+            print(f'failed: {failure["location"]} {failure["month"]}: {failure["error"]}')
+    finally:
+        shutil.rmtree(cache_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before every response')
+    parser.add_argument('--demo', action='store_true', help='run the fetch pipeline against the fixtures and exit')
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        demo(args.delay)
+        return 0
+    with serve(delay=args.delay, port=args.port) as (url_template, _):
+        print(f'serving {FIXTURES_PATH} as {url_template}')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
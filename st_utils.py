@@ -1,5 +1,361 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+# Local imports
+from ds_utils import drift_sketch, experiment_log, streaming_corr
+from ds_utils.sized_lru import SizedLRU
+
+
+# Asset cache
+ASSET_CACHE_MAX_BYTES = 128 * 1024 * 1024   # upper bound for all cached assets of this process
+ASSET_CHECK_INTERVAL = 5.0                  # seconds before a cached file's mtime is checked again
+
+# Image variants (built by scripts/build_image_variants.py)
+IMAGE_MANIFEST_PATH = 'data/image_variants.json'
+STREAMLIT_MAX_IMAGE_WIDTH = 1460            # st.image shrinks anything wider than this on every call
+DEFAULT_COLUMN_WIDTH = 730                  # css pixels of the main content column
+PIXEL_RATIO = 2                             # keep plots sharp on hi-dpi screens
+
+# Experiment log
+EXPERIMENT_REFRESH_S = 5.0                  # seconds between re-reads of the log in live mode
+
+
+class AssetCache:
+    """Process-wide, size-bounded LRU cache for static files (CSS, CSV frames, image bytes).
+
+    Streamlit imports this module once per server process, so every session and every rerun
+    shares the same cache. An entry is revalidated against the file's mtime and size at most
+    once every `check_interval` seconds; if those changed, the file is re-read and only parsed
+    again if its content hash differs. Least recently used entries are evicted as soon as the
+    total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=ASSET_CACHE_MAX_BYTES, check_interval=ASSET_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lru = SizedLRU(max_bytes)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.file_reads = 0
+
+    def get(self, kind, path, parse):
+        path = os.path.normpath(path)
+        key = (kind, path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and now - entry['checked_at'] < self.check_interval:
+                self.hits += 1
+                return entry['value']
+
+            stat = os.stat(path)
+            if entry is not None and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+                entry['checked_at'] = now
+                self.hits += 1
+                return entry['value']
+
+            with open(path, 'rb') as f:
+                raw = f.read()
+            self.file_reads += 1
+            digest = hashlib.sha1(raw).hexdigest()
+            if entry is not None and entry['sha1'] == digest:
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, checked_at=now)
+                self.hits += 1
+                return entry['value']
+
+            self.misses += 1
+            value = parse(raw)
+            self._lru.put(key, {
+                'value': value,
+                'nbytes': _sizeof(value),
+                'sha1': digest,
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'checked_at': now,
+            })
+            return value
+
+    def digest(self, kind, path):
+        """Content hash of a cached asset (None if it has not been loaded yet)."""
+        entry = self._lru.peek((kind, os.path.normpath(path)))
+        return entry['sha1'] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                'entries': len(self._lru),
+                'nbytes': self._lru.nbytes,
+                'max_bytes': self._lru.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'file_reads': self.file_reads,
+            }
+
+
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return 0
+
+
+ASSETS = AssetCache()
+
+
+def load_css(path='style.css'):
+    return ASSETS.get('css', path, lambda raw: raw.decode('utf-8'))
+
+
+def load_csv(path, **read_csv_kwargs):
+    """Cached `pd.read_csv`. The returned frame is shared between sessions, so don't modify it in place."""
+    kind = ('csv', tuple(sorted(read_csv_kwargs.items())))
+    return ASSETS.get(kind, path, lambda raw: pd.read_csv(io.BytesIO(raw), **read_csv_kwargs))
+
+
+def load_image(path):
+    """Cached image bytes, ready to be passed to `st.image`."""
+    try:
+        return ASSETS.get('image', path, bytes)
+    except FileNotFoundError:
+        # Let st.image deal with it, same as when it is handed a path directly
+        return path
+
+
+def load_json(path):
+    return ASSETS.get('json', path, json.loads)
+
+
+def pick_image_variant(path, column_width=DEFAULT_COLUMN_WIDTH):
+    """Return (path, output format) of the smallest prebuilt variant that still fills `column_width`.
+
+    Falls back to the original file if there is no manifest entry for it.
+    """
+    try:
+        manifest = load_json(IMAGE_MANIFEST_PATH)
+    except FileNotFoundError:
+        return path, 'auto'
+    entry = manifest.get(os.path.normpath(path))
+    if entry is None:
+        return path, 'auto'
+
+    needed = min(column_width * PIXEL_RATIO, STREAMLIT_MAX_IMAGE_WIDTH)
+    variants = sorted(entry['variants'], key=lambda v: v['width'])
+    for variant in variants:
+        if variant['width'] >= needed:
+            return variant['path'], variant['format']
+    return variants[-1]['path'], variants[-1]['format']
+
+
+def image(path, column_width=DEFAULT_COLUMN_WIDTH, **kwargs):
+    """`st.image` for files in data/*/, served from the best fitting prebuilt variant.
+
+    Pass the expected css width of the layout column when the image is placed in `st.columns`.
+    """
+    variant, output_format = pick_image_variant(path, column_width)
+    st.image(load_image(variant), output_format=output_format, **kwargs)
+
+
+@st.cache_resource(max_entries=4)
+def _load_sketches(path, mtime_ns):
+    return drift_sketch.load(path)
+
+
+def drift_explorer(path, fallback_image):
+    """Interactive PSI/KS drift check between any two groups of the sketched slices in `path`
+    (see ds_utils.drift_sketch); shows `fallback_image` if there are no sketches."""
+    try:
+        sketches = _load_sketches(path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        image(fallback_image)
+        return
+
+    keys = list(sketches)
+    col1, col2 = st.columns(2)
+    reference = col1.multiselect('Reference', keys, default=keys[:1], key=f'{path}-reference')
+    compared = col2.multiselect('Compared to', keys, default=keys[1:2], key=f'{path}-compared')
+    if not (reference and compared):
+        return
+    a = drift_sketch.merge(sketches[k] for k in reference)
+    b = drift_sketch.merge(sketches[k] for k in compared)
+    report = drift_sketch.compare(a, b)
+    st.caption(f'{a.rows:,} vs. {b.rows:,} rows; PSI from {drift_sketch.BINS} bins (≥ {drift_sketch.PSI_MODERATE} '
+               f'moderate, ≥ {drift_sketch.PSI_MAJOR} major drift), KS from quantile sketches (± 0.01)')
+    st.dataframe(report, hide_index=True, column_config={
+        'psi': st.column_config.NumberColumn('PSI', format='%.4f'),
+        'ks': st.column_config.NumberColumn('KS', format='%.4f'),
+        'missing_a': st.column_config.NumberColumn(format='percent'),
+        'missing_b': st.column_config.NumberColumn(format='percent'),
+    })
+
+    feature = st.selectbox('Feature', report['feature'], key=f'{path}-feature')
+    fa, fb = a.features[feature], b.features[feature]
+    if not (fa.n and fb.n):
+        return
+    grid = np.linspace(min(fa.min, fb.min), max(fa.max, fb.max), 200)
+    cdfs = pd.concat([pd.DataFrame({'value': grid, 'CDF': f.cdf(grid), 'Group': group})
+                      for f, group in [(fa, 'Reference'), (fb, 'Compared')]])
+    st.altair_chart(
+        alt.Chart(cdfs).mark_line().encode(x=alt.X('value:Q', title=feature), y='CDF:Q', color='Group:N'),
+        width='stretch',
+    )
+
+
+@st.cache_resource(max_entries=4)
+def _load_correlations(path, mtime_ns):
+    return streaming_corr.load(path)[1]
+
+
+def correlation_heatmap(path, fallback_image, results=None):
+    """Interactive correlation heatmap of the Comoments saved in `path` (see ds_utils.streaming_corr),
+    or of `results` if given; shows `fallback_image` if there are neither."""
+    if results is None:
+        try:
+            results = _load_correlations(path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            image(fallback_image)
+            return
+
+    col1, col2 = st.columns([1, 3])
+    method = col1.radio('Correlation', streaming_corr.METHODS, format_func=str.capitalize, key=f'{path}-method')
+    stats = results[streaming_corr.METHODS.index(method)]
+    columns = col2.multiselect('Columns', stats.columns, default=stats.columns, key=f'{path}-columns')
+    if len(columns) < 2:
+        return
+    corr = stats.corr(columns)
+    cells = corr.rename_axis('row').reset_index().melt('row', var_name='column', value_name='r')
+    base = alt.Chart(cells).encode(x=alt.X('column:N', sort=columns, title=None),
+                                   y=alt.Y('row:N', sort=columns, title=None))
+    st.altair_chart(
+        base.mark_rect().encode(
+            color=alt.Color('r:Q', scale=alt.Scale(scheme='redblue', domain=[-1, 1], reverse=True)),
+            tooltip=['row', 'column', alt.Tooltip('r:Q', format='.3f')],
+        ) + base.mark_text(fontSize=9).encode(text=alt.Text('r:Q', format='.2f')),
+        width='stretch',
+    )
+
+
+def experiment_explorer(path, fallback_image):
+    """Model comparison rendered from the experiment log in `path` (see ds_utils.experiment_log),
+    re-read every few seconds in live mode; shows `fallback_image` if there is no log."""
+    if experiment_log.open_log(path).version() is None:
+        image(fallback_image)
+        return
+    live = st.toggle('Live', key=f'{path}-live', help=f'Re-read the log every {EXPERIMENT_REFRESH_S:.0f} seconds')
+
+    @st.fragment(run_every=EXPERIMENT_REFRESH_S if live else None)
+    def comparison():
+        _experiment_comparison(path)
+    comparison()
+
+
+def _experiment_comparison(path):
+    summary = experiment_log.summarize(experiment_log.open_log(path).records())
+    runs = summary.groupby('run', sort=False)['started'].first().sort_values(ascending=False)
+    col1, col2, col3 = st.columns([2, 2, 1])
+    selected = col1.multiselect('Runs', runs.index, default=list(runs.index), key=f'{path}-runs',
+                                help='Of a model in several runs, the latest is shown')
+    groups = sorted(summary['group'].unique())
+    groups = col2.multiselect('Groups', groups, default=groups, key=f'{path}-groups')
+    cost = col3.radio('Runtime', ['runtime', 'fit_s'], key=f'{path}-cost',
+                      format_func={'runtime': 'End-to-end', 'fit_s': 'Fit only'}.get)
+    summary = (summary[summary['run'].isin(selected) & summary['group'].isin(groups)]
+               .sort_values('started').drop_duplicates('model', keep='last').sort_values('loss_mean'))
+    if summary.empty:
+        return
+    st.caption(f'{int(summary["folds"].sum())} folds of {len(summary)} models. Runtimes are summed over the folds; '
+               'end-to-end includes the hyperparameter search of tuned models, the feature generation of stacked '
+               "models (their share of the base estimators' out-of-fold predictions), fitting and predicting.")
+
+    tooltip = ['model', 'group', 'folds', alt.Tooltip('loss_mean:Q', format='.4f'),
+               alt.Tooltip('loss_std:Q', format='.4f'), alt.Tooltip(f'{cost}:Q', format='.1f'),
+               alt.Tooltip('peak_mem_mb:Q', format='.0f')]
+    bars = alt.Chart(summary).encode(y=alt.Y('model:N', sort='x', title=None))
+    col1, col2 = st.columns(2)
+    col1.altair_chart(
+        bars.mark_bar().encode(x=alt.X('loss_mean:Q', title='loss'), color='group:N', tooltip=tooltip)
+        + bars.mark_errorbar().encode(x='low:Q', x2='high:Q').transform_calculate(
+            low='datum.loss_mean - datum.loss_std', high='datum.loss_mean + datum.loss_std'),
+        width='stretch',
+    )
+    col2.altair_chart(
+        alt.Chart(summary).mark_circle(size=120).encode(
+            x=alt.X(f'{cost}:Q', scale=alt.Scale(type='log'), title='runtime (s)'),
+            y=alt.Y('loss_mean:Q', scale=alt.Scale(zero=False), title='loss'),
+            color='group:N', tooltip=tooltip,
+        ),
+        width='stretch',
+    )
+    st.dataframe(summary.drop(columns=['run', 'task', 'started']), hide_index=True, column_config={
+        c: st.column_config.NumberColumn(format='%.4f') for c in ['loss_mean', 'loss_std']
+    } | {c: st.column_config.NumberColumn(format='%.2f') for c in experiment_log.STAGES + ['runtime', 'peak_mem_mb']})
+
+
+class Sections:
+    """The `## Section`s of a page, registered as callables and rendered one fragment each.
+
+    Every section runs as an `st.fragment`, so a widget inside a section only reruns that
+    section. Sections registered with `lazy=True` sit behind a collapsed expander and their
+    callable isn't executed at all until a visitor opens it.
+
+        sections = st_utils.Sections()
+
+        @sections.section('eda', 'Exploratory Data Analysis', lazy=True)
+        def eda():
+            ...
+
+        sections.table_of_contents()
+        sections.render()
+    """
+
+    def __init__(self):
+        self._sections = []
+
+    def section(self, anchor, title, lazy=False):
+        def register(func):
+            self._sections.append((anchor, title, func, lazy))
+            return func
+        return register
+
+    def table_of_contents(self):
+        lines = ['# Contents'] + [f'{i}. [{title}](#{anchor})' for i, (anchor, title, _, _) in enumerate(self._sections, 1)]
+        st.sidebar.markdown('\n'.join(lines))
+
+    def render(self):
+        for i, (anchor, title, func, lazy) in enumerate(self._sections):
+            if i > 0:
+                st.divider()
+            # Fragment ids depend on the enclosing container, so each section gets its own
+            with st.container():
+                _section_fragment(anchor, title, func, lazy)
+
+
+@st.fragment
+def _section_fragment(anchor, title, func, lazy):
+    st.markdown(f'<a name="{anchor}"></a>', unsafe_allow_html=True)
+    st.write(f'## {title}')
+    if not lazy:
+        func()
+        return
+    expander = st.expander(f'Show {title}', key=f'section-{anchor}', on_change='rerun')
+    if expander.open:
+        with expander:
+            func()
+
+
 def get_sidebar_links():
     st.sidebar.markdown('''
         <span style="font-size: 0.9em;">Further Links:</span>   
@@ -0,0 +1,59 @@
+"""ds_utils.weather_fetch against the local fixture server (scripts/weather_fixture_server.py).
+
+Run from the repository root: python -m pytest tests
+"""
+import pytest
+
+# Local imports
+from ds_utils import weather_fetch
+from scripts import weather_fixture_server
+
+
+@pytest.fixture
+def server():
+    with weather_fixture_server.serve() as (url_template, requests):
+        yield url_template, requests
+
+
+def fetch(fetcher, url_template, stations=None, refresh=False):
+    fetcher.stats = dict.fromkeys(fetcher.stats, 0)
+    return weather_fetch.fetch_observations(stations or weather_fixture_server.FIXTURE_STATIONS,
+                                            weather_fixture_server.FIXTURE_MONTHS, fetcher, url_template, refresh)
+
+
+def test_cold_cached_revalidated(server, tmp_path):
+    url_template, requests = server
+    fetcher = weather_fetch.Fetcher(str(tmp_path), min_interval=0)
+
+    cold = fetch(fetcher, url_template)
+    assert fetcher.stats['downloaded'] == 1 and len(requests) == 1
+    assert len(cold) and cold['Location'].eq('Albury').all()
+    assert cold.attrs['failures'] == []
+
+    cached = fetch(fetcher, url_template)
+    assert fetcher.stats['cached'] == 1 and len(requests) == 1
+    assert cached.equals(cold)
+
+    revalidated = fetch(fetcher, url_template, refresh=True)
+    assert fetcher.stats['not_modified'] == 1 and fetcher.stats['downloaded'] == 0
+    assert requests[-1][1] is not None          # sent with If-None-Match
+    assert revalidated.equals(cold)
+
+
+def test_failed_station_is_reported(server, tmp_path):
+    url_template, _ = server
+    fetcher = weather_fetch.Fetcher(str(tmp_path), min_interval=0)
+    stations = weather_fixture_server.FIXTURE_STATIONS | {'Nowhere': 'MISSING-FIXTURE'}
+
+    df = fetch(fetcher, url_template, stations)
+    assert df['Location'].eq('Albury').all() and len(df)
+    assert fetcher.stats['failed'] == 1
+    [failure] = df.attrs['failures']
+    assert failure['location'] == 'Nowhere' and '404' in failure['error']
+
+
+def test_all_failed_raises(server, tmp_path):
+    url_template, _ = server
+    fetcher = weather_fetch.Fetcher(str(tmp_path), min_interval=0)
+    with pytest.raises(OSError):
+        fetch(fetcher, url_template, {'Nowhere': 'MISSING-FIXTURE'})